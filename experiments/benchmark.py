@@ -0,0 +1,98 @@
+""" Benchmarks of alternative implementations of the pipeline's stages.
+
+Run as follows, from the project folder:
+$ python -m experiments.benchmark
+"""
+
+from __future__ import absolute_import
+
+import time
+
+import src.feature_store as fs
+import src.learning as lear
+import src.main as main
+import src.modeling as mod
+import src.partitioning as part
+import src.preprocessing as pre
+from src.lib import apriori
+
+
+_REPETITIONS = 5
+_WORLDS = 20
+
+
+def benchmark_coauthorship_rules(references, repetitions=_REPETITIONS):
+  """ Compares the general Apriori against the level 2 fast path for the
+      coauthorship rules of each block.
+
+  Args:
+    references: a list of lists with the blocked references.
+    repetitions: the number of times each implementation is run.
+
+  Returns:
+    A tuple (apriori_time, pairs_time, equal) with the average time of each
+      implementation over all blocks and whether the rules are equal.
+  """
+  transactions = [mod.get_coauthorship_transactions(block) for block in
+      references]
+  sup_min = [mod._MIN_SUPPORT_LEVEL_1, mod._MIN_SUPPORT_LEVEL_2]
+  apriori_time = 0
+  pairs_time = 0
+  equal = True
+  for _ in range(repetitions):
+    for block_transactions in transactions:
+      mapped, mapper, itemset = apriori.GetMapper(block_transactions)
+      time_i = time.time()
+      rules = apriori.AprioriVertical(mapper, mapped, itemset, sup_min,
+          mod._MIN_CONFIDENCE, 0, 2)
+      time_f = time.time()
+      pair_rules = apriori.GetPairRules(mapper, mapped, itemset, sup_min,
+          mod._MIN_CONFIDENCE)
+      apriori_time += time_f - time_i
+      pairs_time += time.time() - time_f
+      equal = equal and rules == pair_rules
+  return apriori_time / repetitions, pairs_time / repetitions, equal
+
+
+def benchmark_world_engines(references, probs, n_worlds=_WORLDS):
+  """ Compares the methods of sampling alternative worlds.
+
+  Args:
+    references: a list of lists with the blocked references.
+    probs: the list of probabilities of correference of each block.
+    n_worlds: the number of alternative worlds sampled by each method.
+
+  Returns:
+    A list of tuples (method, worlds_per_second), one for each method.
+  """
+  base_world, _ = part.iter_possible_worlds(references, probs, 0)
+  distance_matrices = [part.transform_distance_matrix(pm) for pm in
+      part.get_probability_matrices(references, probs)]
+  k_clusters = [part.number_of_clusters(block) for block in base_world]
+  rates = []
+  for method in part._METHODS:
+    time_i = time.time()
+    for _ in part.iter_alternative_worlds(distance_matrices, k_clusters,
+        n_worlds, seed=1, method=method):
+      pass
+    rates.append((method, n_worlds / (time.time() - time_i)))
+  return rates
+
+
+if __name__ == '__main__':
+  references = pre.read_data(main._TEST_FILE)
+  apriori_time, pairs_time, equal = benchmark_coauthorship_rules(references)
+  print 'COAUTHORSHIP_RULES'
+  print 'apriori,%f' % apriori_time
+  print 'pairs,%f' % pairs_time
+  print 'equal,%s' % equal
+
+  store = fs.FeatureStore(main._FEATURE_DIR)
+  training_references, corpus = pre.get_input(main._TRAINING_FILE,
+      labeled=True)
+  pred = lear.train(training_references, corpus, store=store)
+  references, corpus = pre.get_input(main._TEST_FILE)
+  probs = lear.test(references, corpus, pred, store=store)
+  print 'WORLD_ENGINES'
+  for method, rate in benchmark_world_engines(references, probs):
+    print '%s,%f' % (method, rate)
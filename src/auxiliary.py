@@ -1,6 +1,12 @@
 """ Contains common and simple procedures used by several modules. """
 
+import collections
+import multiprocessing
 import os
+import random
+import struct
+
+import numpy as np
 
 
 def adequate_dir(dirname):
@@ -16,3 +22,143 @@ def adequate_dir(dirname):
   if not os.path.isdir(dirname):
     os.makedirs(dirname)
   return dirname if dirname[-1] == '/' else dirname + '/'
+
+
+def parallel_map(function, arguments, workers=1, weights=None):
+  """ Applies a function to each argument, possibly sharding the arguments
+      across a pool of processes.
+
+  Observations:
+    - The arguments are dispatched one at a time in decreasing order of weight,
+      so that the largest tasks are scheduled first and do not leave the other
+      workers idle at the end.
+    - The function has to be defined at the top level of a module, so that it
+      can be sent to the worker processes.
+    - Each worker process reseeds its random generators from the operating
+      system, since forked workers would otherwise share the state of the
+      parent process and draw the same random numbers.
+
+  Args:
+    function: the function to apply.
+    arguments: a list with a tuple of positional arguments for each call.
+    workers: the number of processes; if 1 or less, the arguments are processed
+      serially in the current process.
+    weights: an optional list with the expected cost of each argument.
+
+  Returns:
+    A list with the results, in the same order of the arguments.
+  """
+  if workers <= 1 or len(arguments) <= 1:
+    return [function(*argument) for argument in arguments]
+  order = range(len(arguments))
+  if weights is not None:
+    order.sort(key=lambda i: weights[i], reverse=True)
+  pool = multiprocessing.Pool(min(workers, len(arguments)), seed_worker)
+  try:
+    results = pool.map(apply_arguments, [(function, arguments[i]) for i in
+        order], chunksize=1)
+  finally:
+    pool.close()
+    pool.join()
+  ordered_results = [None] * len(arguments)
+  for i, result in zip(order, results):
+    ordered_results[i] = result
+  return ordered_results
+
+
+def iter_batches(iterable, batch_size):
+  """ Groups the items of an iterable in consecutive lists, consuming it
+      lazily.
+
+  Args:
+    iterable: the iterable, such as a generator.
+    batch_size: the number of items of each list, except the last one.
+
+  Returns:
+    A generator of lists of items.
+  """
+  batch = []
+  for item in iterable:
+    batch.append(item)
+    if len(batch) == batch_size:
+      yield batch
+      batch = []
+  if batch:
+    yield batch
+
+
+def get_random_seed():
+  """ Draws a seed for the random generators from the operating system.
+
+  Returns:
+    A 32-bit unsigned integer.
+  """
+  return struct.unpack('I', os.urandom(4))[0]
+
+
+def seed_worker():
+  """ Seeds the random generators of a worker process from the operating
+      system, as the initializer of the pools of parallel_map. """
+  seed = get_random_seed()
+  random.seed(seed)
+  np.random.seed(seed)
+
+
+def apply_arguments(call):
+  """ Calls a function with a tuple of arguments, as sent by parallel_map.
+
+  Args:
+    call: a tuple (function, arguments).
+
+  Returns:
+    The result of the function.
+  """
+  function, arguments = call
+  return function(*arguments)
+
+
+class LRUCache(object):
+  """ A dictionary bounded in size, which discards the least recently used
+    entries when full. """
+
+  def __init__(self, max_size):
+    """ Initializes an empty cache.
+
+    Args:
+      max_size: the maximum number of entries.
+    """
+    self.max_size = max_size
+    self.entries = collections.OrderedDict()
+
+  def get(self, key, default=None):
+    """ Gets the value of a key, marking it as the most recently used.
+
+    Args:
+      key: the key to look for.
+      default: the value returned if the key is absent.
+
+    Returns:
+      The value of the key or default.
+    """
+    if key not in self.entries:
+      return default
+    value = self.entries.pop(key)
+    self.entries[key] = value
+    return value
+
+  def put(self, key, value):
+    """ Inserts a value, discarding the least recently used entry if full.
+
+    Args:
+      key: the key of the entry.
+      value: the value of the entry.
+    """
+    if key in self.entries:
+      del self.entries[key]
+    elif len(self.entries) >= self.max_size:
+      self.entries.popitem(last=False)
+    self.entries[key] = value
+
+  def __len__(self):
+    """ Gets the number of entries. """
+    return len(self.entries)
@@ -0,0 +1,166 @@
+""" Module with the cache of the results of the pipeline stages, keyed by a
+    digest of their inputs and parameters.
+"""
+
+import cPickle as pickle
+import hashlib
+import os
+import zlib
+
+from src import auxiliary as aux
+
+
+_MAX_SIZE = 2 ** 30
+_COMPRESSION_LEVEL = 1
+_FORMAT_VERSION = 2
+
+
+def get_file_digest(filename):
+  """ Gets the digest of the content of a file.
+
+  Args:
+    filename: the name of the file.
+
+  Returns:
+    A string with the hexadecimal digest.
+  """
+  digest = hashlib.sha1()
+  data_file = open(filename, 'rb')
+  for chunk in iter(lambda: data_file.read(2 ** 20), ''):
+    digest.update(chunk)
+  data_file.close()
+  return digest.hexdigest()
+
+
+def get_parameters(module):
+  """ Gets the parameters of a module, which are the constants named in upper
+      case and starting with underscore.
+
+  Args:
+    module: the module object.
+
+  Returns:
+    A sorted list of tuples (name, value).
+  """
+  return sorted((name, value) for name, value in vars(module).items() if
+      name.startswith('_') and name.isupper() and isinstance(value, (bool, int,
+      long, float, str)))
+
+
+class StageCache(object):
+  """ Stores the result of each stage of the pipeline as a compressed binary
+    pickle, named after the stage and the digest of everything it depends on.
+    The least recently used results are evicted when the total size exceeds a
+    bound.
+  """
+
+  def __init__(self, dirname=None, max_size=_MAX_SIZE):
+    """ Initializes the cache in a directory, creating it if necessary.
+
+    Args:
+      dirname: the name of the directory with the results or None, if results
+        should never be stored, and every stage is computed.
+      max_size: the maximum number of bytes of stored results.
+    """
+    self.dirname = aux.adequate_dir(dirname) if dirname else None
+    self.max_size = max_size
+    self.hits = {}
+    self.misses = {}
+
+  def get_key(self, stage, *parts):
+    """ Gets the key of a stage result.
+
+    Observations:
+      - The key also depends on _FORMAT_VERSION and on the pickle protocol, so
+        that the results stored before a change in the format of the objects
+        are ignored. _FORMAT_VERSION has to be increased whenever the pickled
+        objects of any stage change.
+
+    Args:
+      stage: the name of the stage.
+      parts: the values the result depends on, such as parameters and the keys
+        of upstream stages, which must have a deterministic representation.
+
+    Returns:
+      A string with the hexadecimal digest.
+    """
+    return hashlib.sha1(repr((_FORMAT_VERSION, pickle.HIGHEST_PROTOCOL,
+        stage) + parts)).hexdigest()
+
+  def get_filename(self, stage, key):
+    """ Gets the name of the file of a stage result. """
+    return '%s%s-%s.pkl.z' % (self.dirname, stage, key)
+
+  def fetch(self, stage, key, function, *args):
+    """ Gets the result of a stage, either loaded from the cache or computed
+        and then stored.
+
+    Args:
+      stage: the name of the stage.
+      key: the key of the result, as returned by get_key.
+      function: the function which computes the result.
+      args: the arguments of function.
+
+    Returns:
+      The result of the stage.
+    """
+    if self.dirname:
+      filename = self.get_filename(stage, key)
+      if os.path.isfile(filename):
+        self.hits[stage] = self.hits.get(stage, 0) + 1
+        os.utime(filename, None)
+        return self.load(filename)
+    self.misses[stage] = self.misses.get(stage, 0) + 1
+    result = function(*args)
+    if self.dirname:
+      self.save(filename, result)
+      self.evict()
+    return result
+
+  def load(self, filename):
+    """ Loads a result from a file. """
+    result_file = open(filename, 'rb')
+    data = result_file.read()
+    result_file.close()
+    return pickle.loads(zlib.decompress(data))
+
+  def save(self, filename, result):
+    """ Saves a result to a file.
+
+    Observations:
+      - The result is written to a temporary file and then renamed, so that an
+        interrupted run never leaves a partial result under a valid key.
+    """
+    temp_filename = '%s.%d.tmp' % (filename, os.getpid())
+    result_file = open(temp_filename, 'wb')
+    result_file.write(zlib.compress(pickle.dumps(result,
+        pickle.HIGHEST_PROTOCOL), _COMPRESSION_LEVEL))
+    result_file.close()
+    os.rename(temp_filename, filename)
+
+  def evict(self):
+    """ Removes the least recently used results until the total size is within
+        the bound.
+    """
+    entries = []
+    for name in os.listdir(self.dirname):
+      if name.endswith('.pkl.z'):
+        info = os.stat(self.dirname + name)
+        entries.append((info.st_mtime, info.st_size, name))
+    entries.sort()
+    total_size = sum(size for _, size, _ in entries)
+    for _, size, name in entries[:-1]:
+      if total_size <= self.max_size:
+        break
+      os.remove(self.dirname + name)
+      total_size -= size
+
+  def report(self):
+    """ Formats the hits and misses of each stage.
+
+    Returns:
+      A string with a line for each stage.
+    """
+    stages = sorted(set(self.hits) | set(self.misses))
+    return '\n'.join('%s: %d hits, %d misses' % (stage, self.hits.get(stage,
+        0), self.misses.get(stage, 0)) for stage in stages)
@@ -0,0 +1,102 @@
+""" On-disk store of the similarity vectors of blocks, keyed by the content of
+    the blocks and the modeling parameters.
+"""
+
+import hashlib
+import os
+
+import numpy as np
+
+from src import auxiliary as aux
+from src import modeling as mod
+
+
+_VERSION = 1
+
+
+class FeatureStore(object):
+  """ Keeps the similarity vectors of each block in a NumPy file, named after a
+    hash of everything the vectors depend on, so only changed blocks are
+    recomputed and unchanged ones are memory-mapped back.
+  """
+
+  def __init__(self, dirname):
+    """ Initializes the store in a directory, creating it if necessary.
+
+    Args:
+      dirname: the name of the directory with the stored arrays.
+    """
+    self.dirname = aux.adequate_dir(dirname)
+    self.hits = 0
+    self.misses = 0
+
+  def get_key(self, block, idf, pairs=None):
+    """ Gets the key of a block, which changes whenever its similarity vectors
+        may change.
+
+    Observations:
+      - Besides the references' attributes and the modeling parameters, the
+        key covers the idf of the words of the block's names and @max_idf,
+        given to the words absent from the idf, which are the only entries of
+        the corpus used for the block.
+
+    Args:
+      block: a list of reference objects.
+      idf: a dictionary with the inversed frequency as values and words as keys.
+      pairs: the tuple (rows, cols) with the compared pairs or None, for all.
+
+    Returns:
+      A string with the hexadecimal digest.
+    """
+    digest = hashlib.sha1()
+    digest.update(repr((_VERSION, mod._STFIDF_THRESHOLD,
+        mod._MIN_SUPPORT_LEVEL_1, mod._MIN_SUPPORT_LEVEL_2,
+        mod._MIN_CONFIDENCE, mod._MAX_LEVEL)))
+    words = set()
+    for ref in block:
+      digest.update(repr((ref.name, ref.title, ref.coauthors, ref.venue)))
+      words.update(mod.get_words(ref.name))
+    digest.update(repr(sorted((w, idf[w]) for w in words if w in idf)))
+    digest.update(repr(idf.get('@max_idf')))
+    if pairs is not None:
+      digest.update(np.asarray(pairs[0], dtype=np.int64).tostring())
+      digest.update(np.asarray(pairs[1], dtype=np.int64).tostring())
+    return digest.hexdigest()
+
+  def get_filename(self, key):
+    """ Gets the name of the file of a key. """
+    return self.dirname + key + '.npy'
+
+  def load(self, key):
+    """ Loads the similarity vectors of a key, if stored.
+
+    Args:
+      key: the key of the block.
+
+    Returns:
+      A read-only memory-mapped array or None, if absent.
+    """
+    filename = self.get_filename(key)
+    if not os.path.isfile(filename):
+      self.misses += 1
+      return None
+    self.hits += 1
+    return np.load(filename, mmap_mode='r')
+
+  def save(self, key, sim_vectors):
+    """ Stores the similarity vectors of a key.
+
+    Observations:
+      - The array is written to a temporary file and then renamed, so that an
+        interrupted run never leaves a partial array under a valid key.
+
+    Args:
+      key: the key of the block.
+      sim_vectors: the array with the similarity vectors.
+    """
+    filename = self.get_filename(key)
+    temp_filename = '%s.%d.tmp' % (filename, os.getpid())
+    temp_file = open(temp_filename, 'wb')
+    np.save(temp_file, sim_vectors)
+    temp_file.close()
+    os.rename(temp_filename, filename)
@@ -0,0 +1,192 @@
+""" Module for the incremental ingestion of references, which updates only the
+    blocks receiving new references instead of the whole corpus.
+"""
+
+import cPickle as pickle
+
+import numpy as np
+
+from src import modeling as mod
+from src import partitioning as part
+from src import preprocessing as pre
+from src import prob_ranking as prob_rank
+
+
+class IncrementalRanker(object):
+  """ Keeps the state of the pipeline for a growing set of references, so that
+    new references are added with a cost proportional to the changed blocks.
+
+  Observations:
+    - New references come in blocks, as in the input files, and each block
+      either extends the block previously added with the same key or starts a
+      new block. Only the pairs involving new references are modeled and
+      classified, the document frequencies of the names are updated in place,
+      and the worlds and matchings are redone only for the changed blocks.
+    - The matchings of each block are kept as the matched labels of its
+      alternative worlds, so that ranking only maps them to positions.
+    - The features of previous pairs depend on the idf of the whole corpus and
+      on the coauthorship rules of the block, so they become slightly stale as
+      references arrive. With refresh, all the pairs of a changed block are
+      recomputed, which is still proportional to the changed blocks.
+  """
+
+  def __init__(self, pred, n_alternatives, seed=None, method='distance',
+      refresh=False):
+    """ Initializes an empty state.
+
+    Args:
+      pred: the predictor object (from sklearn) with the logistic regression.
+      n_alternatives: the number of alternatives worlds.
+      seed: an integer to seed the random generators or None.
+      method: the method of the alternative worlds, one of
+        partitioning._METHODS.
+      refresh: whether all pairs of a changed block are recomputed, instead of
+        only the new ones.
+    """
+    self.pred = pred
+    self.n_alternatives = n_alternatives
+    self.seed = seed
+    self.method = method
+    self.refresh = refresh
+    self.references = []
+    self.block_index = {}
+    self.frequencies = {}
+    self.collection_size = 0
+    self.n_references = 0
+    self.prob_matrices = []
+    self.base_world = []
+    self.alt_blocks = []
+    self.block_pairs = []
+
+  def add_file(self, filename, keys=None, limit=False):
+    """ Adds the references of a file, in the input format, keeping its blocks.
+
+    Args:
+      filename: the name of the file with the references.
+      keys: a list with the key of each block of the file or None, as in add.
+      limit: the maximum number of references read or False, for all.
+
+    Returns:
+      A sorted list with the indices of the changed blocks.
+    """
+    return self.add(pre.read_data(filename, limit=limit), keys)
+
+  def add(self, blocks, keys=None):
+    """ Adds new references and updates the changed blocks.
+
+    Args:
+      blocks: a list of lists of reference objects, each one with the new
+        references of a block, whose ids are reassigned following the previous
+        references.
+      keys: a list with the key of each block or None, for all new blocks. A
+        block whose key was already added extends the block of that key, while
+        a block whose key is None always starts a new block.
+
+    Returns:
+      A sorted list with the indices of the changed blocks.
+    """
+    n_previous = {}
+    for block, key in zip(blocks, keys or [None] * len(blocks)):
+      if key in self.block_index:
+        i = self.block_index[key]
+      else:
+        i = len(self.references)
+        if key is not None:
+          self.block_index[key] = i
+        self.references.append([])
+        self.prob_matrices.append(np.ones((0, 0)))
+        self.base_world.append([])
+        self.alt_blocks.append([])
+        self.block_pairs.append([])
+      n_previous.setdefault(i, len(self.references[i]))
+      for ref in block:
+        ref.refid = self.n_references
+        self.n_references += 1
+        self.references[i].append(ref)
+    corpus = pre.get_corpus(blocks)
+    mod.get_document_frequencies(corpus, self.frequencies)
+    self.collection_size += len(corpus)
+
+    scorer = mod.SoftTfidf(mod.get_idf_from_frequencies(self.frequencies,
+        self.collection_size))
+    changed = sorted(n_previous)
+    for i in changed:
+      self.update_probabilities(i, 0 if self.refresh else n_previous[i],
+          scorer)
+      self.update_worlds(i)
+    return changed
+
+  def update_probabilities(self, i, n_previous, scorer):
+    """ Computes the probabilities of the pairs of a block involving the
+        references from n_previous on.
+
+    Args:
+      i: the index of the block.
+      n_previous: the number of references of the block whose pairs are kept.
+      scorer: a SoftTfidf object built from the current idf.
+    """
+    block = self.references[i]
+    prob_matrix = np.ones((len(block), len(block)))
+    prob_matrix[:n_previous, :n_previous] = \
+        self.prob_matrices[i][:n_previous, :n_previous]
+    rows, cols = mod.get_pairs(len(block))
+    new = cols >= n_previous
+    rows, cols = rows[new], cols[new]
+    if len(rows):
+      probs = self.pred.predict_proba(mod.model_block(block, scorer, (rows,
+          cols)))[:, 1]
+      prob_matrix[rows, cols] = probs
+      prob_matrix[cols, rows] = probs
+    self.prob_matrices[i] = prob_matrix
+
+  def update_worlds(self, i):
+    """ Samples again the base and alternative partitionings of a block and
+        matches them.
+
+    Args:
+      i: the index of the block.
+    """
+    block = self.references[i]
+    rows, cols = mod.get_pairs(len(block))
+    self.base_world[i], self.alt_blocks[i] = part.get_block_worlds(block,
+        self.prob_matrices[i][rows, cols].tolist(), self.n_alternatives,
+        self.seed, i, self.method)
+    arrays = {}
+    self.block_pairs[i] = prob_rank.match_labels(prob_rank.get_label_array(
+        self.base_world[i], arrays), [prob_rank.get_label_array(a_part_block,
+        arrays) for a_part_block in self.alt_blocks[i]])
+
+  def rank(self):
+    """ Merges the blocks into a probabilistic ranking.
+
+    Observations:
+      - Only the base ranking is built with the lists of references of its
+        authors, and the matched labels of each block are mapped to positions
+        without building the alternative rankings.
+
+    Returns:
+      A probabilistic ranking with the base ranking plus uncertainties.
+    """
+    base_ranking = prob_rank.get_ranking(self.references, self.base_world, len)
+    alt_worlds = [[a_part_blocks[j] for a_part_blocks in self.alt_blocks] for j
+        in range(self.n_alternatives)]
+    matchings = prob_rank.get_label_mapping(self.base_world, alt_worlds,
+        self.block_pairs)
+    uncertainty = prob_rank.normalize_uncertainties(
+        prob_rank.calculate_uncertainties(matchings))
+    base_ranking.set_uncertainty(uncertainty)
+    return base_ranking
+
+  def save(self, filename):
+    """ Saves the state to a file, to be continued in another run. """
+    state_file = open(filename, 'wb')
+    pickle.dump(self, state_file, pickle.HIGHEST_PROTOCOL)
+    state_file.close()
+
+  @staticmethod
+  def load(filename):
+    """ Loads a state saved to a file. """
+    state_file = open(filename, 'rb')
+    ranker = pickle.load(state_file)
+    state_file.close()
+    return ranker
@@ -1,41 +1,187 @@
 """ Module for learning the probability of correference. """
 
+from src import cache as sc
 from src import modeling as mod
 from sklearn import linear_model as lm
+from scipy import sparse
+import cPickle as pickle
+import numpy as np
+import os
+import sys
 
 
-def train(references, corpus):
+_PREDICT_CHUNK = 100000
+_MODEL_VERSION = 1
+
+
+def train(references, corpus, workers=1, store=None):
   """ Learns a logistic regression.
   
   Args:
     references: the list of references grouped in blocks.
     corpus: the corpus of names.
+    workers: the number of processes used for modeling the blocks.
+    store: an optional FeatureStore for the similarity vectors of the blocks.
 
   Returns:
     A predictor represented by a logistic regression.
   """
-  sim_vectors, classes = mod.model(references, corpus, labeled=True)
+  sim_vectors, classes = mod.model_arrays(references, corpus, labeled=True,
+      workers=workers, store=store)
   pred = lm.LogisticRegression()
-  pred.fit(sum(sim_vectors, []), classes)
+  pred.fit(np.concatenate(sim_vectors), classes)
   return pred
 
 
-def test(references, corpus, pred):
+def test(references, corpus, pred, workers=1, prune=False, store=None):
   """ Applies the logistic regression to a set of references.
 
   Args:
     references: the list of references grouped in blocks.
     corpus: the corpus of names in the test.
     pred: the predictor object (from sklearn) with the logistic regression.
+    workers: the number of processes among which the blocks are sharded.
+    prune: whether only the candidate pairs of each block, as given by
+      modeling.get_candidate_pairs, are compared.
+    store: an optional FeatureStore for the similarity vectors of the blocks.
 
   Returns:
     A list with the probabilities of correference, i.e., of belonging to class 
-      1, grouped in blocks. Each block contains the pair of references built in
-      lexicographic ordering.
+      1, grouped in blocks. Each block is an array, a view of the probabilities
+      of all blocks, with the pairs of references built in lexicographic
+      ordering. If prune, each block is instead a sparse upper
+      triangular matrix with the probabilities of the candidate pairs, and the
+      pairs absent from it are considered pruned.
+  """
+  pairs = [mod.get_candidate_pairs(block) for block in references] if prune \
+      else None
+  sim_vectors = mod.model_arrays(references, corpus, workers=workers,
+      pairs=pairs, store=store)
+  probs = predict_blocks(pred, sim_vectors)
+  if prune:
+    probs = [sparse.csr_matrix((block_probs, block_pairs), shape=(len(block),
+        len(block))) for block, block_probs, block_pairs in zip(references,
+        probs, pairs)]
+  return probs
+
+
+def iter_test(blocks, idf, pred, prune=False, store=None):
+  """ Applies the logistic regression to a stream of blocks, one at a time.
+
+  Args:
+    blocks: an iterable of lists of reference objects.
+    idf: the inverse document frequence of the whole corpus, as returned by
+      modeling.get_idf_from_blocks.
+    pred: the predictor object (from sklearn) with the logistic regression.
+    prune: whether only the candidate pairs of each block are compared.
+    store: an optional FeatureStore for the similarity vectors of the blocks.
+
+  Returns:
+    A generator of tuples (block, probs), with the probabilities of each block
+      in the same format as test.
+  """
+  scorer = mod.SoftTfidf(idf)
+  for block in blocks:
+    pairs = mod.get_candidate_pairs(block) if prune else None
+    probs = predict_block(pred, mod.get_block_vectors(block, scorer, pairs,
+        store))
+    if prune:
+      probs = sparse.csr_matrix((probs, pairs), shape=(len(block), len(block)))
+    yield block, probs
+
+
+def predict_blocks(pred, sim_vectors, chunk_size=_PREDICT_CHUNK):
+  """ Applies the logistic regression to the pairs of all blocks at once.
+
+  Observations:
+    - The vectors of all blocks are concatenated and classified with one call
+      for each chunk of chunk_size pairs, which avoids the overhead of a call
+      for each of many small blocks while bounding the memory of the call.
+
+  Args:
+    pred: the predictor object (from sklearn) with the logistic regression.
+    sim_vectors: a list with the similarity vectors of the pairs of each block.
+    chunk_size: the maximum number of pairs classified in a single call.
+
+  Returns:
+    A list with an array of probabilities of correference for each block, which
+      are views of a single array.
   """
-  sim_vectors = mod.model(references, corpus)
-  probs = []
-  for block in sim_vectors:
-    probs.append(pred.predict_proba(block))
-  return [[prob[1] for prob in prob_group] for prob_group in probs]
+  offsets = np.cumsum([0] + [len(block) for block in sim_vectors])
+  probs = np.empty(offsets[-1])
+  if offsets[-1]:
+    sim_matrix = np.concatenate([block for block in sim_vectors if len(block)])
+    for start in range(0, len(sim_matrix), chunk_size):
+      probs[start:start+chunk_size] = pred.predict_proba(
+          sim_matrix[start:start+chunk_size])[:, 1]
+  return [probs[offsets[i]:offsets[i+1]] for i in range(len(sim_vectors))]
+
 
+def predict_block(pred, sim_vectors):
+  """ Applies the logistic regression to the pairs of a single block.
+
+  Args:
+    pred: the predictor object (from sklearn) with the logistic regression.
+    sim_vectors: the similarity vectors of the pairs of the block.
+
+  Returns:
+    An array with the probabilities of correference of the pairs.
+  """
+  if not len(sim_vectors):
+    return np.empty(0)
+  return pred.predict_proba(sim_vectors)[:, 1]
+
+
+def get_model_parameters():
+  """ Gets the parameters the similarity vectors and the predictor depend on,
+      which are the ones of the modeling and learning modules. """
+  return {'modeling': sc.get_parameters(mod), 'learning':
+      sc.get_parameters(sys.modules[__name__])}
+
+
+def save_model(filename, pred, idf):
+  """ Saves the predictor with the idf and the parameters it was built with as
+      a versioned artifact.
+
+  Observations:
+    - The artifact is written to a temporary file and then renamed, so that a
+      reader never loads a partial artifact.
+
+  Args:
+    filename: the name of the artifact file.
+    pred: the predictor object (from sklearn) with the logistic regression.
+    idf: the inverse document frequence of the names, as returned by
+      modeling.get_idf.
+  """
+  artifact = {'version': _MODEL_VERSION, 'predictor': pred, 'idf': idf,
+      'parameters': get_model_parameters()}
+  temp_filename = '%s.%d.tmp' % (filename, os.getpid())
+  model_file = open(temp_filename, 'wb')
+  pickle.dump(artifact, model_file, pickle.HIGHEST_PROTOCOL)
+  model_file.close()
+  os.rename(temp_filename, filename)
+
+
+def load_model(filename):
+  """ Loads a model artifact saved with save_model.
+
+  Args:
+    filename: the name of the artifact file.
+
+  Returns:
+    A tuple (pred, idf) with the predictor and the idf of the artifact.
+
+  Raises:
+    ValueError: if the artifact has another version or was built with other
+      modeling or learning parameters than the current ones.
+  """
+  model_file = open(filename, 'rb')
+  artifact = pickle.load(model_file)
+  model_file.close()
+  if artifact.get('version') != _MODEL_VERSION:
+    raise ValueError('Model artifact %s has version %s instead of %d' %
+        (filename, artifact.get('version'), _MODEL_VERSION))
+  if artifact['parameters'] != get_model_parameters():
+    raise ValueError('Model artifact %s was built with other parameters' %
+        filename)
+  return artifact['predictor'], artifact['idf']
@@ -7,6 +7,8 @@
 
 from sys import argv,exit
 from time import time
+from scipy import sparse
+import numpy as np
 
 """
 Objetivo: Este algoritmo implementa o algoritmo
@@ -221,6 +223,195 @@ def ExtendPrefixTree(candidates,level):
 
     return new_candidates
 
+# ------------------------------------------------------------- #
+"""
+ADICIONADO: Implementa o apriori com a representação vertical da base
+(estilo Eclat). Cada item guarda um bitset com as transações em que
+aparece, e o suporte de um candidato é a contagem de bits da interseção
+dos bitsets dos candidatos que o geraram. Produz as mesmas regras que a
+função Apriori.
+"""
+def AprioriVertical(mapper,transactions,itemset,min_sup,confidence_min,\
+        rare_item,level_max):
+
+    num_transactions = len(transactions)
+
+    # Guarda todos os itens frequentes.
+    frequents = list()
+    # Guarda os candidatos atuais
+    candidates = list()
+
+    # Inicializa o primeiro nível de expansão do apriori, com o bitset
+    # de transações de cada item.
+    tidsets = GetTidsets(transactions)
+    for item in itemset:
+        temp_set = set()
+        temp_set.add(item)
+        sub_item_set = SubItemSet(temp_set)
+        sub_item_set.tids = tidsets[item]
+        candidates.append(sub_item_set)
+
+    level = 0
+    while(candidates):
+
+        # Escolhe o suporte.
+        min_support = min_sup[level]
+
+        # Computa o suporte dos itens
+        ComputeSupportVertical(candidates)
+
+        # Guarda os itens frequentes.
+        frequents_level = list()
+
+        # Recupera os candidatos frequentes.
+        for candidate in candidates:
+
+            # Transforma o suporte de inteiro para porcentagem.
+            candidate.support = float(candidate.support)/\
+                    num_transactions
+            # Se o candidato não tem o suporte mínimo, descarta.
+            if (candidate.support >= min_support):
+                frequents_level.append(candidate)
+
+        # Armazena os itens frequentes deste nível
+        if(rare_item):
+            frequents.extend(candidates)
+        else:
+            frequents.extend(frequents_level)
+
+        # Verifica se o nível máximo definido foi atingido.
+        level += 1
+        if(level == level_max):
+            break
+
+        # Expande os itens frequentes deste nível, afim de gerar
+        # novos candidatos
+        candidates = ExtendPrefixTreeHashed(frequents_level,level)
+
+    return GetRules(frequents,mapper,confidence_min)
+
+# ------------------------------------------------------------- #
+"""
+ADICIONADO: Recupera o bitset de transações de cada item, em que o
+i-ésimo bit indica a presença do item na i-ésima transação.
+"""
+def GetTidsets(transactions):
+
+    tidsets = dict()
+    for tid, transaction in enumerate(transactions):
+        bit = 1 << tid
+        for item in transaction:
+            tidsets[item] = tidsets.get(item, 0) | bit
+    return tidsets
+
+# ------------------------------------------------------------- #
+"""
+ADICIONADO: Calcula o suporte dos candidatos pela contagem de bits de
+seus bitsets de transações.
+"""
+def ComputeSupportVertical(candidates):
+
+    for candidate in candidates:
+        candidate.support = bin(candidate.tids).count("1")
+
+# ------------------------------------------------------------- #
+"""
+ADICIONADO: Gera novos candidatos como ExtendPrefixTree, mas verifica
+os candidatos já processados e os do nível de cima em conjuntos com
+hash, e calcula o bitset de transações de cada novo candidato pela
+interseção dos bitsets dos candidatos que o geraram.
+"""
+def ExtendPrefixTreeHashed(candidates,level):
+
+    # Conjunto dos candidatos já processados.
+    processed_candidates = set()
+
+    # Lista de novos candidatos.
+    new_candidates = list()
+
+    # Recupera o conjunto de candidatos do nível de cima.
+    old_candidates = set(frozenset(x.items) for x in candidates)
+
+    for leaf_a in range(len(candidates)):
+        for leaf_b in range(leaf_a+1,len(candidates)):
+
+            # O conjunto é mantido para preservar a ordem dos itens nas
+            # regras, e sua versão imutável é usada nas buscas.
+            union_ab = candidates[leaf_a].items.union(candidates[leaf_b].items)
+            key_ab = frozenset(union_ab)
+
+            # Impõe a regra que os itens gerados devem ser de tamanho 1 a mais
+            # que os candidatos atuais e que sejam do mesmo pai.
+            if(len(union_ab) > (level+1)) or (key_ab in processed_candidates):
+                break
+
+            # Verifica se cada subconjunto, combinado pelo tamanho do nível,
+            # existe nos itens frequentes do nível atual.
+            valid = 1
+            for element in union_ab:
+                if ((key_ab - frozenset([element])) not in old_candidates):
+                    valid = 0
+                    break
+            if(valid):
+                sub_item_set = SubItemSet(union_ab)
+                sub_item_set.tids = candidates[leaf_a].tids & \
+                        candidates[leaf_b].tids
+                new_candidates.append(sub_item_set)
+                processed_candidates.add(key_ab)
+
+    return new_candidates
+
+# ------------------------------------------------------------- #
+"""
+ADICIONADO: Caminho rápido para o nível máximo 2, que só precisa dos
+suportes dos itens e dos pares. Constrói a matriz de coocorrência
+item por item em uma passada pelas transações e obtém as confianças
+diretamente dela, sem a geração de candidatos e a busca de regras em
+todos os pares de itemsets frequentes. Produz as mesmas regras que a
+função Apriori com level_max igual a 2.
+"""
+def GetPairRules(mapper,transactions,itemset,min_sup,confidence_min):
+
+    num_transactions = len(transactions)
+    num_items = len(itemset)
+    if not num_transactions or not num_items:
+        return {}
+
+    # Matriz binária de transações por itens e sua coocorrência, em
+    # que a diagonal contém a contagem de cada item.
+    indices = [item for transaction in transactions for item in transaction]
+    indptr = np.cumsum([0] + [len(transaction) for transaction in \
+            transactions])
+    incidence = sparse.csr_matrix((np.ones(len(indices)),indices,indptr),\
+            shape=(num_transactions,num_items))
+    cooccurrence = (incidence.T * incidence).tocoo()
+
+    # Suportes em porcentagem, como no Apriori.
+    support_items = incidence.sum(axis=0).A1/num_transactions
+    frequent_items = support_items >= min_sup[0]
+
+    # Pares de itens frequentes distintos e frequentes.
+    item_a = cooccurrence.row
+    item_b = cooccurrence.col
+    support_ab = cooccurrence.data/num_transactions
+    valid = (item_a != item_b) & frequent_items[item_a] & \
+            frequent_items[item_b]
+    if len(min_sup) > 1:
+        valid &= support_ab >= min_sup[1]
+    else:
+        valid[:] = False
+    confidences = support_ab[valid]/support_items[item_a[valid]]
+
+    rules = {}
+    for a, b, confidence in zip(item_a[valid],item_b[valid],confidences):
+        if(confidence < confidence_min):
+            continue
+        rule_a = str(mapper[a])
+        if rule_a not in rules:
+            rules[rule_a] = {}
+        rules[rule_a][str(mapper[b])] = float(confidence)
+    return rules
+
 # ------------------------------------------------------------- #
 """
 Recupera todas as combinações de confiança dos itemsets frequentes.
@@ -337,7 +528,9 @@ def run_apriori(transactions, sup_min, confidence_min, level_max):
 # Recupera informações básicas.
   transactions,mapper,itemset = GetMapper(transactions)#GetBasicInfos(file_in,separator)
 # Inicia o Apriori.
-  return Apriori(mapper,transactions,itemset,sup_min,confidence_min,rare_item,level_max)
+  if level_max == 2 and not rare_item:
+    return GetPairRules(mapper,transactions,itemset,sup_min,confidence_min)
+  return AprioriVertical(mapper,transactions,itemset,sup_min,confidence_min,rare_item,level_max)
 
 # ------------------------------------------------------------- #
 """
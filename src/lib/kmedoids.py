@@ -1,19 +1,25 @@
 import itertools
 import random
 
-def kmedoids(dist, k, max_iterations=10000):
+import numpy as np
+from scipy.spatial import distance
+
+def kmedoids(dist, k, max_iterations=10000, hamming_matrix=None):
   """ Performs a kmedoids clustering from precomputed distances.
 
   Args:
-    dist: a list of lists with the elements' distances.
+    dist: a list of lists or an array with the elements' distances.
     k: the number of clusters.
     max_iterations: the maximum number of iterations to try convergence.
+    hamming_matrix: an optional array with the hamming distances between the
+      rows of dist, as returned by get_hamming_matrix.
 
   Returns:
     A list of labels, coding clusters from 0 to k - 1.
   """
+  dist = np.asarray(dist)
   elements = range(len(dist))
-  medoids = initial_medoids(dist, k)
+  medoids = initial_medoids(dist, k, hamming_matrix=hamming_matrix)
 
   converg = False
   iterations = 0
@@ -25,6 +31,37 @@ def kmedoids(dist, k, max_iterations=10000):
   return get_labels(assoc_medoid)
 
 
+def kmedoids_runs(dist, k, n_runs, max_iterations=10000,
+    max_combinations=100):
+  """ Performs several kmedoids clusterings from the same precomputed
+      distances.
+
+  Observations:
+    - The distances are converted to an array once and, if cheaper than
+      computing them for each candidate configuration, the hamming distances
+      between rows used for the initial medoids are computed once for all runs.
+
+  Args:
+    dist: a list of lists or an array with the elements' distances.
+    k: the number of clusters.
+    n_runs: the number of clusterings.
+    max_iterations: the maximum number of iterations to try convergence.
+    max_combinations: the maximum number of configurations to be analyzed for
+      the initial medoids.
+
+  Returns:
+    A generator of lists of labels, coding clusters from 0 to k - 1, one for
+      each run.
+  """
+  dist = np.asarray(dist, dtype=float)
+  hamming_matrix = None
+  if n_runs * min(max_combinations, n_combinations(len(dist), k)) * k ** 2 > \
+      len(dist) ** 2:
+    hamming_matrix = get_hamming_matrix(dist)
+  for _ in xrange(n_runs):
+    yield kmedoids(dist, k, max_iterations, hamming_matrix)
+
+
 def hamming(vec_a, vec_b):
   """ Calculates hamming distance between a pair of vectors.
   
@@ -65,7 +102,19 @@ def n_combinations(size, group):
   return amount
 
 
-def initial_medoids(dist, k, max_combinations=100):
+def get_hamming_matrix(dist):
+  """ Calculates the hamming distance between every pair of rows of a matrix.
+
+  Args:
+    dist: an array with the matrix.
+
+  Returns:
+    An array with the hamming distance of each pair of rows.
+  """
+  return np.rint(distance.cdist(dist, dist, 'hamming') * dist.shape[1])
+
+
+def initial_medoids(dist, k, max_combinations=100, hamming_matrix=None):
   """ Uses a heuristic to obtain the initial medoids.
 
   Observations:
@@ -78,10 +127,13 @@ def initial_medoids(dist, k, max_combinations=100):
     dist: the matrix with distance between points.
     k: the number of clusters and, thus, medoids.
     max_combinations: the maximum number of configurations to be analyzed.
+    hamming_matrix: an optional array with the hamming distances between the
+      rows of dist, as returned by get_hamming_matrix.
 
   Returns:
-    A list of medoids, represented as indexes.
+    A sorted list of medoids, represented as indexes.
   """
+  dist = np.asarray(dist)
   n_el = len(dist)
   comb = None
   if n_combinations(n_el, k) < max_combinations:
@@ -90,50 +142,46 @@ def initial_medoids(dist, k, max_combinations=100):
 
   min_cost = float('inf')
   sel_medoids = None
-  seen_samples = []
   for i in range(max_combinations):
-    cost = 0
     if comb:
-      medoids = comb.next()
+      medoids = list(comb.next())
     else:
       medoids = random.sample(range(n_el), k)
-      seen_samples.append(medoids)
-    for m1 in medoids:
-      for m2 in medoids:
-        cost += - hamming(dist[m1], dist[m2])
+    if hamming_matrix is not None:
+      cost = - hamming_matrix[np.ix_(medoids, medoids)].sum()
+    else:
+      rows = dist[medoids]
+      cost = - round(distance.cdist(rows, rows, 'hamming').sum() * n_el)
     if cost < min_cost:
       min_cost = cost
-      sel_medoids = list(medoids)
+      sel_medoids = medoids
   
-  return sel_medoids
+  return sorted(sel_medoids)
 
 
 def assign_medoids(dist, elements, medoids):
   """ Assigns the closest medoid for each element.
 
+  Observations:
+    - Ties between closest medoids are broken at random, to avoid favoring the
+      first listed.
+
   Args:
-    dist: a list of lists with the distance matrix.
+    dist: a list of lists or an array with the distance matrix.
     elements: the elements, which are just the range of indexes.
     medoids: the list of medoids' indices.
 
   Returns:
     A list with the associated medoid for each element.
   """
-  assoc_medoid = [0] * len(elements)
-  
-  for medoid in medoids:
-    assoc_medoid[medoid] = medoid
-  for element in [e for e in elements if e not in medoids]:
-    min_dist = float('inf')
-    close_medoid = None
-    random.shuffle(medoids) # avoids favoring the first listed
-    for medoid in medoids:
-      if dist[element][medoid] < min_dist:
-        close_medoid = medoid
-        min_dist = dist[element][medoid]
-    assoc_medoid[element] = close_medoid
+  medoids = np.asarray(medoids)
+  medoid_dist = np.asarray(dist)[np.ix_(elements, medoids)]
+  ties = medoid_dist == medoid_dist.min(1)[:, np.newaxis]
+  closest = np.argmax(ties * (1.0 - np.random.random_sample(ties.shape)), 1)
+  assoc_medoid = medoids[closest]
+  assoc_medoid[medoids] = medoids
 
-  return assoc_medoid
+  return assoc_medoid.tolist()
 
 
 def calculate_cost(dist, elements, medoid, assoc_medoid):
@@ -152,7 +200,9 @@ def calculate_cost(dist, elements, medoid, assoc_medoid):
   Returns:
     An integer with the total cost of the configuration.
   """
-  return sum([dist[medoid][e] for e in elements if assoc_medoid[e] == medoid])
+  elements = np.asarray(elements)
+  members = elements[np.asarray(assoc_medoid)[elements] == medoid]
+  return np.asarray(dist)[medoid, members].sum()
 
 
 def update_medoids(dist, elements, medoids, assoc_medoid):
@@ -160,10 +210,13 @@ def update_medoids(dist, elements, medoids, assoc_medoid):
 
   Observations:
     - An update is performed if a non-medoid from a cluster is switched with the
-      medoid and reduces the total cost.
+      medoid and reduces the total cost. Among the members with the least cost,
+      one is chosen at random.
+    - The cost of every member as the medoid of its cluster is obtained at once,
+      from the distance matrix masked by the cluster co-membership.
 
   Args:
-    dist: a list of lists with the distance matrix.
+    dist: a list of lists or an array with the distance matrix.
     elements: the range of elements' indices.
     medoids: the current medoids' indices.
     assoc_medoids: the list with the associated medoid for each element.
@@ -173,23 +226,24 @@ def update_medoids(dist, elements, medoids, assoc_medoid):
       occurence and medoids is the, possibly new, list of medoids' indices.
   """
   converg = True
-
-  for medoid in medoids:
-    min_cost = calculate_cost(dist, elements, medoid, assoc_medoid) 
-    new_medoid = None
-    random.shuffle(elements)
-    for element in [e for e in elements if e not in medoids and assoc_medoid[e]
-        == medoid]:
-      new_cost = calculate_cost(dist, elements, element, [m if m != medoid else
-        element for m in assoc_medoid])
-      if new_cost < min_cost:
-        min_cost = new_cost
-        new_medoid = element
-    if new_medoid != None:
+  dist = np.asarray(dist)
+  elements = np.asarray(elements)
+  assoc_medoid = np.asarray(assoc_medoid)[elements]
+  same_cluster = assoc_medoid[:, np.newaxis] == assoc_medoid
+  costs = np.where(same_cluster, dist[np.ix_(elements, elements)], 0).sum(1)
+
+  new_medoids = list(medoids)
+  for i, medoid in enumerate(medoids):
+    candidates = (assoc_medoid == medoid) & (elements != medoid)
+    if not candidates.any():
+      continue
+    min_cost = costs[candidates].min()
+    if min_cost < costs[elements == medoid].sum():
       converg = False
-      medoids = [m if m != medoid else new_medoid for m in medoids]
+      new_medoids[i] = random.choice(elements[candidates & (costs ==
+          min_cost)].tolist())
 
-  return converg, medoids
+  return converg, new_medoids
 
 
 def get_labels(assoc_medoid):
@@ -202,9 +256,4 @@ def get_labels(assoc_medoid):
   Returns:
     A new list with cluster labels coded from 0 to k - 1.
   """
-  curr = 0
-  labels = assoc_medoid[:]
-  for medoid in sorted(set(assoc_medoid)):
-    labels = [l if l != medoid else curr for l in labels]
-    curr += 1
-  return labels
+  return np.unique(assoc_medoid, return_inverse=True)[1].tolist()
@@ -0,0 +1,43 @@
+import unittest
+
+import apriori
+
+class CoauthorshipTestCase(unittest.TestCase):
+
+  def setUp(self):
+    self.transactions = [['m jones', 'e rundensteiner', 'y huang'],
+                         ['matthew c jones', 'e rundensteiner', 'h kuno',
+                          'p marron', 'v taube', 'y ra'],
+                         ['matthew c jones', 'e rundensteiner', 'y huang'],
+                         ['mike w miller', 'l berg'],
+                         ['mike w miller']]
+
+  def test_get_tidsets(self):
+    transactions, mapper, itemset = apriori.GetMapper(self.transactions)
+    tidsets = apriori.GetTidsets(transactions)
+    decoded = {mapper[item]: tids for item, tids in tidsets.items()}
+    self.assertEqual(decoded['e rundensteiner'], 0b111)
+    self.assertEqual(decoded['matthew c jones'], 0b110)
+    self.assertEqual(decoded['mike w miller'], 0b11000)
+
+  def test_apriori_vertical(self):
+    for level_max in [1, 2, 3]:
+      sup_min = [0.2] * level_max
+      transactions, mapper, itemset = apriori.GetMapper(self.transactions)
+      truth = apriori.Apriori(mapper, transactions, itemset, sup_min, 0.1, 0,
+          level_max)
+      transactions, mapper, itemset = apriori.GetMapper(self.transactions)
+      result = apriori.AprioriVertical(mapper, transactions, itemset, sup_min,
+          0.1, 0, level_max)
+      self.assertEqual(result, truth)
+
+  def test_get_pair_rules(self):
+    for sup_min in [[0.2, 0.2], [0.2, 0.5], [0.5, 0.2]]:
+      transactions, mapper, itemset = apriori.GetMapper(self.transactions)
+      truth = apriori.Apriori(mapper, transactions, itemset, sup_min, 0.6, 0, 2)
+      result = apriori.GetPairRules(mapper, transactions, itemset, sup_min, 0.6)
+      self.assertEqual(result, truth)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -1,5 +1,7 @@
 import unittest
 
+import numpy as np
+
 import kmedoids
 
 class FourElementsTestCase(unittest.TestCase):
@@ -99,6 +101,23 @@ class TenElementsTestCase(unittest.TestCase):
         [0, 1, 0, 0, 0, 1, 1, 0, 1, 1], [1, 0, 1, 1, 1, 0, 0, 1, 0, 0]]
     self.assertIn(kmedoids.kmedoids(self.dist, 2), truth_set)
 
+  def test_kmedoids_array(self):
+    truth_set = [[0, 0, 0, 0, 0, 1, 1, 1, 1, 1], [1, 1, 1, 1, 1, 0, 0, 0, 0, 0],
+        [0, 1, 0, 0, 0, 1, 1, 1, 1, 1], [1, 0, 1, 1, 1, 0, 0, 0, 0, 0],
+        [0, 0, 0, 0, 0, 1, 1, 0, 1, 1], [1, 1, 1, 1, 1, 0, 0, 1, 0, 0],
+        [0, 1, 0, 0, 0, 1, 1, 0, 1, 1], [1, 0, 1, 1, 1, 0, 0, 1, 0, 0]]
+    self.assertIn(kmedoids.kmedoids(np.array(self.dist), 2), truth_set)
+
+  def test_kmedoids_runs(self):
+    truth_set = [[0, 0, 0, 0, 0, 1, 1, 1, 1, 1], [1, 1, 1, 1, 1, 0, 0, 0, 0, 0],
+        [0, 1, 0, 0, 0, 1, 1, 1, 1, 1], [1, 0, 1, 1, 1, 0, 0, 0, 0, 0],
+        [0, 0, 0, 0, 0, 1, 1, 0, 1, 1], [1, 1, 1, 1, 1, 0, 0, 1, 0, 0],
+        [0, 1, 0, 0, 0, 1, 1, 0, 1, 1], [1, 0, 1, 1, 1, 0, 0, 1, 0, 0]]
+    runs = list(kmedoids.kmedoids_runs(self.dist, 2, 5))
+    self.assertEqual(len(runs), 5)
+    for labels in runs:
+      self.assertIn(labels, truth_set)
+
 
 if __name__ == '__main__':
   unittest.main()
@@ -5,64 +5,101 @@ $ python -m src.main
 """
 
 from sklearn import linear_model
+import argparse
 import os
 import sys
-import pickle as pkl
 import time
 
 import src.preprocessing as pre
 import src.learning as lear
 import src.partitioning as part
 import src.auxiliary as aux
+import src.cache as sc
+import src.feature_store as fs
 import src.modeling as mod
 import src.prob_ranking as prob_rank
+from src.lib import kmedoids
 
 
 _TRAINING_FILE = 'data/training.dat'
 _TEST_FILE = 'data/data.dat'
 _ITERATIONS = 10
-_PKL_PROBS = 'pkl/probs.pkl'
-_PKL_REFS = 'pkl/refs.pkl'
 _TIME_FILE = 'time/time_input_size_%d.dat'
 _INPUT_LIMIT = False
+_WORKERS = 1
+_SEED = None
+_PRUNE = False
+_METHOD = 'distance'
+_FEATURE_DIR = 'cache/features/'
+_STAGE_DIR = 'cache/stages/'
+_STREAM = False
+_MODEL_FILE = None
+_TOLERANCE = None
+_TIME_BUDGET = None
+_ADAPTIVE_BATCH = 10
+_BLOCK_BUDGET = False
 
 
-def probabilistic_disambiguation(print_time=False):
+def is_adaptive():
+  """ Checks whether the number of alternative worlds is adaptive, stopping at
+      convergence or at the time budget. """
+  return _TOLERANCE is not None or _TIME_BUDGET is not None
+
+
+def get_predictor(cache, store):
+  """ Gets the predictor trained on the training file.
+
+  Args:
+    cache: the StageCache object with the results of the stages.
+    store: the FeatureStore object for the similarity vectors or None.
+
+  Returns:
+    A tuple (pred, model_key) with the predictor and its key in cache.
+  """
+  training_key = cache.get_key('parse', sc.get_file_digest(_TRAINING_FILE),
+      True, False, sc.get_parameters(pre))
+  references, corpus = cache.fetch('parse', training_key, pre.get_input,
+      _TRAINING_FILE, True)
+  model_key = cache.get_key('model', training_key, sc.get_parameters(mod),
+      sc.get_parameters(lear))
+  pred = cache.fetch('model', model_key, lear.train, references, corpus,
+      _WORKERS, store)
+  return pred, model_key
+
+
+def probabilistic_disambiguation(cache, print_time=False):
   """ Performs probabilistic disambiguation, including training fase, for a set
       of references.
 
   Observations:
-    - The returned values are serialized since they are the same between
-      different iterations.
+    - The parsed input, the predictor and the probabilities are fetched from
+      the stage cache, keyed by the digests of the input files and the
+      parameters of the modules involved.
+    - If _MODEL_FILE is set, the predictor and the idf of the test corpus are
+      saved to it as a model artifact.
 
   Args:
+    cache: the StageCache object with the results of the stages.
     print_time: whether time elapsed during this function execution should be
     printed.
 
   Returns:
-    A blocked list of references to be ranked and a list of probabilistic
-    matrices, one for each block.
+    A blocked list of references to be ranked, a list of probabilistic
+    matrices, one for each block, and the key of the probabilities in cache.
   """
   time_i = time.time()
   
-  if os.path.isfile(_PKL_PROBS) and os.path.isfile(_PKL_REFS):
-    pkl_file = open(_PKL_REFS, 'r')
-    references = pkl.load(pkl_file)
-    pkl_file.close()
-    pkl_file = open(_PKL_PROBS, 'r')
-    probs = pkl.load(pkl_file)
-    pkl_file.close()
-  else:
-    references, corpus = pre.get_input(_TRAINING_FILE, labeled=True)
-    pred = lear.train(references, corpus)
-    references, corpus = pre.get_input(_TEST_FILE, limit=_INPUT_LIMIT)
-    pkl_file = open(_PKL_REFS, 'w')
-    probs = pkl.dump(references, pkl_file)
-    pkl_file.close()
-    probs = lear.test(references, corpus, pred)
-    pkl_file = open(_PKL_PROBS, 'w')
-    probs = pkl.dump(probs, pkl_file)
-    pkl_file.close()
+  store = fs.FeatureStore(_FEATURE_DIR) if _FEATURE_DIR else None
+  pred, model_key = get_predictor(cache, store)
+  test_key = cache.get_key('parse', sc.get_file_digest(_TEST_FILE), False,
+      _INPUT_LIMIT, sc.get_parameters(pre))
+  references, corpus = cache.fetch('parse', test_key, pre.get_input,
+      _TEST_FILE, False, _INPUT_LIMIT)
+  probs_key = cache.get_key('probs', model_key, test_key, _PRUNE)
+  probs = cache.fetch('probs', probs_key, lear.test, references, corpus, pred,
+      _WORKERS, _PRUNE, store)
+  if _MODEL_FILE:
+    lear.save_model(_MODEL_FILE, pred, mod.get_idf(corpus))
   
   time_f = time.time()
   if print_time:
@@ -71,24 +108,53 @@ def probabilistic_disambiguation(print_time=False):
     print >> time_file, time_f - time_i
     time_file.close()
     
-  return references, probs
+  return references, probs, probs_key
 
 
-def possible_worlds_sampling(references, probs, print_time=False):
+def possible_worlds_sampling(references, probs, cache, probs_key,
+    print_time=False):
   """ Samples the set of possible worlds, discriminating between a base case
       (most probable one) and alternative cases.
 
+  Observations:
+    - The worlds are fetched from the stage cache only if a seed is given,
+      since otherwise each run samples different alternative worlds. In that
+      case, the alternative worlds are returned as a generator, which the
+      ranking consumes as they are sampled.
+    - In the adaptive mode, with _TOLERANCE or _TIME_BUDGET set, the worlds are
+      always returned as a generator of up to _ITERATIONS worlds, sampled in
+      batches of _ADAPTIVE_BATCH, so that the ones after the stop are never
+      sampled.
+    - With _BLOCK_BUDGET, the blocks are sampled in proportion to their
+      entropy, and the blocks with negligible entropy keep their base
+      partitioning in every alternative world.
+
   Args:
     references: the blocked list of references to be ranked.
     probs: the list of probability matrices for each block.
+    cache: the StageCache object with the results of the stages.
+    probs_key: the key of the probabilities in cache.
   
   Returns:
-    The base world and a list with alternative worlds.
+    The base world and a list or a generator with alternative worlds.
   """
   time_i = time.time()
   
-  base_world, alt_worlds = part.get_possible_worlds(references, probs,
-      _ITERATIONS)
+  if is_adaptive():
+    base_world, alt_worlds = part.iter_possible_worlds(references, probs,
+        _ITERATIONS, workers=_WORKERS, seed=_SEED,
+        batch_size=_ADAPTIVE_BATCH, method=_METHOD, block_budget=_BLOCK_BUDGET)
+  elif _SEED is None:
+    base_world, alt_worlds = part.iter_possible_worlds(references, probs,
+        _ITERATIONS, workers=_WORKERS, seed=_SEED, method=_METHOD,
+        block_budget=_BLOCK_BUDGET)
+  else:
+    worlds_key = cache.get_key('worlds', probs_key, _ITERATIONS, _SEED,
+        _METHOD, _BLOCK_BUDGET, sc.get_parameters(part),
+        sc.get_parameters(kmedoids))
+    base_world, alt_worlds = cache.fetch('worlds', worlds_key,
+        part.get_possible_worlds, references, probs, _ITERATIONS, _WORKERS,
+        _SEED, _METHOD, False, _BLOCK_BUDGET)
 
   time_f = time.time()
   if print_time:
@@ -107,14 +173,22 @@ def probabilistic_ranking(references, base_world, alt_worlds, print_time=False):
   Args:
     references: the blocked list of references to be ranked.
     base_world: the partitioning of blocks in base world.
-    alt_worlds: a list of different partitionings in alternative worlds.
+    alt_worlds: a list or a generator of different partitionings in
+      alternative worlds.
 
   Returns:
     A probabilistic ranking object.
   """
   time_i = time.time()
   
-  ranking = prob_rank.rank(references, base_world, alt_worlds)
+  if is_adaptive():
+    ranking, n_worlds, reason = prob_rank.rank_adaptive(references,
+        base_world, alt_worlds, _TOLERANCE, _TIME_BUDGET, _WORKERS,
+        _ADAPTIVE_BATCH)
+    print >> sys.stderr, 'alternative worlds: %d (%s)' % (n_worlds, reason)
+  else:
+    ranking = prob_rank.rank(references, base_world, alt_worlds,
+        workers=_WORKERS)
 
   time_f = time.time()
   if print_time:
@@ -126,6 +200,66 @@ def probabilistic_ranking(references, base_world, alt_worlds, print_time=False):
   
   return ranking
 
+def streaming_ranking(cache, print_time=False):
+  """ Outputs a probabilistic ranking consuming the test file one block at a
+      time.
+
+  Observations:
+    - The test file is read twice: first for the idf of the names and then for
+      the modeling, prediction and sampling of each block in turn, so that only
+      the similarity vectors and probabilities of the current block are kept
+      in memory. The result equals the one of the staged pipeline.
+    - The references and the base and alternative partitionings of all the
+      blocks, which are lists of labels, are kept until the end, since the
+      position of an author in the ranking depends on every block of a world.
+      The alternative worlds are then assembled lazily and matched in batches,
+      so that at most a batch of worlds is built at once.
+    - Only the predictor is fetched from the stage cache.
+    - The adaptive mode and the block budgets, which need the probabilities
+      of all blocks at once, are not supported.
+
+  Args:
+    cache: the StageCache object with the results of the stages.
+    print_time: whether time elapsed during this function execution should be
+    printed.
+
+  Returns:
+    A probabilistic ranking object.
+  """
+  time_i = time.time()
+
+  store = fs.FeatureStore(_FEATURE_DIR) if _FEATURE_DIR else None
+  pred, _ = get_predictor(cache, store)
+  idf = mod.get_idf_from_blocks(pre.iter_blocks(_TEST_FILE,
+      limit=_INPUT_LIMIT))
+  if _MODEL_FILE:
+    lear.save_model(_MODEL_FILE, pred, idf)
+  references = []
+  base_world = []
+  alt_blocks = []
+  for i, (block, probs) in enumerate(lear.iter_test(pre.iter_blocks(
+      _TEST_FILE, limit=_INPUT_LIMIT), idf, pred, _PRUNE, store)):
+    b_part_block, a_part_blocks = part.get_block_worlds(block, probs,
+        _ITERATIONS, _SEED, i, _METHOD)
+    references.append(block)
+    base_world.append(b_part_block)
+    alt_blocks.append(a_part_blocks)
+  alt_worlds = ([a_part_blocks[j] for a_part_blocks in alt_blocks] for j in
+      range(_ITERATIONS))
+  ranking = prob_rank.rank(references, base_world, alt_worlds,
+      workers=_WORKERS)
+
+  time_f = time.time()
+  if print_time:
+    time_file = open(_TIME_FILE, 'a')
+    print >> time_file, 'STREAMING_RANKING'
+    print >> time_file, time_f - time_i
+    print >> time_file, ''
+    time_file.close()
+
+  return ranking
+
+
 def main(print_time=False):
   """ Main function that outputs a probabilistic ranking.
 
@@ -138,27 +272,79 @@ def main(print_time=False):
   Retunrs:
     A ranking object with the probabilistic ranking.
   """
-  references, probs = probabilistic_disambiguation(print_time=print_time)
-  base_world, alt_worlds = possible_worlds_sampling(references, probs,
+  cache = sc.StageCache(_STAGE_DIR)
+  if _STREAM:
+    ranking = streaming_ranking(cache, print_time=print_time)
+    print >> sys.stderr, cache.report()
+    return ranking
+  references, probs, probs_key = probabilistic_disambiguation(cache,
       print_time=print_time)
+  base_world, alt_worlds = possible_worlds_sampling(references, probs, cache,
+      probs_key, print_time=print_time)
   ranking = probabilistic_ranking(references, base_world, alt_worlds,
       print_time=print_time)
+  print >> sys.stderr, cache.report()
 
   return ranking
 
 
 if __name__ == '__main__':
-  import sys
-  print_time=False
-  if (sys.argv[1] == '-t'): # display time measures
-    _ITERATIONS = int(sys.argv[2])
-    print_time = True
-  else:
-    _ITERATIONS = int(sys.argv[1])
-  if len(sys.argv) > 3:
-    _INPUT_LIMIT = int(sys.argv[3])
+  parser = argparse.ArgumentParser(description='Outputs a probabilistic '
+      'ranking of researchers.')
+  parser.add_argument('-t', dest='print_time', action='store_true',
+      help='display time measures')
+  parser.add_argument('-w', dest='workers', type=int, default=_WORKERS,
+      help='number of processes among which the blocks are sharded')
+  parser.add_argument('-s', dest='seed', type=int, default=_SEED,
+      help='seed for the random generators')
+  parser.add_argument('-p', dest='prune', action='store_true',
+      help='compare only pairs of references sharing some name token, '
+      'coauthor, title word or venue, or with coauthorship similarity')
+  parser.add_argument('-m', dest='method', choices=part._METHODS,
+      default=_METHOD, help='method of the alternative worlds')
+  parser.add_argument('-n', dest='no_store', action='store_true',
+      help='recompute all stages and similarity vectors instead of using the '
+      'caches')
+  parser.add_argument('-l', dest='stream', action='store_true',
+      help='read and process the input lazily, one block at a time')
+  parser.add_argument('-a', dest='model_file', default=_MODEL_FILE,
+      help='file in which the model artifact, used by src.service, is saved')
+  parser.add_argument('-c', dest='tolerance', type=int, default=_TOLERANCE,
+      help='stop sampling alternative worlds when no normalized uncertainty '
+      'changes by more than this between batches')
+  parser.add_argument('-b', dest='time_budget', type=float,
+      default=_TIME_BUDGET, help='stop sampling alternative worlds after '
+      'this number of seconds')
+  parser.add_argument('-e', dest='block_budget', action='store_true',
+      help='sample each block in proportion to the entropy of its '
+      'probabilities, reusing the base partitioning of deterministic blocks')
+  parser.add_argument('iterations', type=int,
+      help='number of alternative worlds, the maximum one if -c or -b is '
+      'given')
+  parser.add_argument('input_limit', type=int, nargs='?',
+      help='maximum number of references read from the input')
+  args = parser.parse_args()
+  if args.stream and (args.tolerance is not None or args.time_budget is not
+      None or args.block_budget):
+    parser.error('-l is not supported with -c, -b or -e, which need the '
+        'probabilities of all blocks at once')
+  _ITERATIONS = args.iterations
+  _WORKERS = args.workers
+  _SEED = args.seed
+  _PRUNE = args.prune
+  _METHOD = args.method
+  _STREAM = args.stream
+  _MODEL_FILE = args.model_file
+  _TOLERANCE = args.tolerance
+  _TIME_BUDGET = args.time_budget
+  _BLOCK_BUDGET = args.block_budget
+  if args.no_store:
+    _FEATURE_DIR = None
+    _STAGE_DIR = None
+  if args.input_limit:
+    _INPUT_LIMIT = args.input_limit
     _TIME_FILE = _TIME_FILE % _INPUT_LIMIT
   else:
     _TIME_FILE = _TIME_FILE % _ITERATIONS 
 
-  print main(print_time=print_time)
+  print main(print_time=args.print_time)
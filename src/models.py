@@ -1,7 +1,25 @@
 """ Module containing the models. """
 
+import numpy as np
+from scipy import sparse
+
+
+def intern_string(value):
+  """ Interns a string, so that equal strings share a single object, and
+      returns other values unchanged. """
+  return intern(value) if type(value) is str else value
+
+
 class Reference(object):
-  """ Represents a reference for a researcher in a publication. """
+  """ Represents a reference for a researcher in a publication.
+
+  Observations:
+    - The attributes are kept in slots and the name, coauthors, venue and label
+      strings are interned, so that the many references repeating them share a
+      single copy.
+  """
+
+  __slots__ = ('refid', 'name', 'title', 'coauthors', 'venue', 'label')
   
   def __init__(self, refid, name, title, coauthors, venue, label):
     """ Initializes all the elements which characterizes the reference.
@@ -20,11 +38,20 @@ class Reference(object):
       None.
     """
     self.refid = refid
-    self.name = name
+    self.name = intern_string(name)
     self.title = title
-    self.coauthors = coauthors
-    self.venue = venue
-    self.label = label
+    self.coauthors = [intern_string(coauthor) for coauthor in coauthors]
+    self.venue = intern_string(venue)
+    self.label = intern_string(label)
+
+  def __getstate__(self):
+    """ Gets the attributes for pickling, since there is no __dict__. """
+    return (self.refid, self.name, self.title, self.coauthors, self.venue,
+        self.label)
+
+  def __setstate__(self, state):
+    """ Restores the attributes from pickling, interning them again. """
+    self.__init__(*state)
 
   def __eq__(self, other):
     """ Compares two references only by attributes and not by reference. """
@@ -44,6 +71,105 @@ class Reference(object):
             self.venue, self.label)
 
 
+class Vocabulary(object):
+  """ Maps values, such as names or words, to consecutive integer ids. """
+
+  def __init__(self, values=None):
+    """ Initializes the vocabulary, optionally with initial values.
+
+    Args:
+      values: an iterable of values to be encoded in order or None.
+    """
+    self.index = {}
+    self.values = []
+    for value in values or []:
+      self.get_id(value)
+
+  def get_id(self, value):
+    """ Gets the id of a value, assigning the next one if unseen. """
+    if value not in self.index:
+      self.index[value] = len(self.values)
+      self.values.append(value)
+    return self.index[value]
+
+  def get_ids(self, values):
+    """ Gets the ids of a list of values. """
+    return [self.get_id(value) for value in values]
+
+  def __len__(self):
+    """ Gets the number of distinct values. """
+    return len(self.values)
+
+
+class Block(object):
+  """ Columnar representation of a block of references, with the attributes
+    encoded as integer ids in arrays.
+
+  Observations:
+    - The coauthors and the title words of the references are variable-length,
+      so they are stored as a flat array of ids plus an array with the offset of
+      each reference, as in the rows of a CSR matrix. The ids of each reference
+      are sorted, the coauthors keeping repetitions and the words not.
+    - The vocabularies may be shared among blocks, to have global ids.
+    - The tokenizer of the titles has no default, so that the words of a block
+      are always the ones of the features, as given by modeling.get_words.
+  """
+
+  def __init__(self, references, tokenize, vocabularies=None):
+    """ Encodes the references of a block.
+
+    Args:
+      references: a list of reference objects.
+      tokenize: the function splitting a title into words, such as
+        modeling.get_words.
+      vocabularies: a dictionary with the Vocabulary objects of the fields
+        'name', 'coauthor', 'venue' and 'word', missing ones being created.
+    """
+    vocabularies = dict(vocabularies or {})
+    for field in ['name', 'coauthor', 'venue', 'word']:
+      vocabularies.setdefault(field, Vocabulary())
+    self.references = references
+    self.names = vocabularies['name']
+    self.coauthors = vocabularies['coauthor']
+    self.venues = vocabularies['venue']
+    self.words = vocabularies['word']
+    self.refids = np.array([ref.refid for ref in references], dtype=int)
+    self.name_ids = np.array(self.names.get_ids([ref.name for ref in
+        references]), dtype=int)
+    self.venue_ids = np.array(self.venues.get_ids([ref.venue for ref in
+        references]), dtype=int)
+    self.coauthor_ids, self.coauthor_offsets = self.get_lists([sorted(
+        self.coauthors.get_ids(ref.coauthors)) for ref in references])
+    self.word_ids, self.word_offsets = self.get_lists([sorted(set(
+        self.words.get_ids(tokenize(ref.title)))) for ref in references])
+
+  def get_lists(self, lists):
+    """ Flattens lists of ids into an array of ids and an array of offsets. """
+    offsets = np.zeros(len(lists) + 1, dtype=int)
+    offsets[1:] = np.cumsum([len(ids) for ids in lists])
+    return np.array(sum(lists, []), dtype=int), offsets
+
+  def get_coauthor_matrix(self):
+    """ Gets a sparse matrix with the count of each coauthor id in each
+        reference. """
+    return self.get_matrix(self.coauthor_ids, self.coauthor_offsets,
+        len(self.coauthors))
+
+  def get_title_matrix(self):
+    """ Gets a binary sparse matrix with the word ids in the title of each
+        reference. """
+    return self.get_matrix(self.word_ids, self.word_offsets, len(self.words))
+
+  def get_matrix(self, ids, offsets, n_values):
+    """ Builds a sparse matrix from lists of ids flattened with offsets. """
+    return sparse.csr_matrix((np.ones(len(ids), dtype=int), ids, offsets),
+        shape=(len(self), n_values))
+
+  def __len__(self):
+    """ Gets the number of references. """
+    return len(self.references)
+
+
 class Ranking(object):
   """ Models a ranking of authros with ordering, uncertainty, authors and blocks
     information.
@@ -1,12 +1,26 @@
 """ Module for references partitioning into researchers' clusters. """
 
 from sklearn.cluster.dbscan_ import dbscan
+from scipy import sparse
+from scipy.sparse import csgraph
+from scipy.spatial.distance import squareform
 import numpy as np
+import random
 
-from src.lib.kmedoids import kmedoids
+from src import auxiliary as aux
+from src.lib.kmedoids import get_labels, kmedoids, kmedoids_runs
 
 
-def get_possible_worlds(references, probs, n_alternatives):
+_PRUNED_PROBABILITY = 0.0
+_BATCH_SIZE = 100
+_METHODS = ('distance', 'kmedoids', 'components', 'union-find')
+_EDGE_METHODS = ('components', 'union-find')
+_DETERMINISTIC_ENTROPY = 1e-3
+_ENTROPY_EPSILON = 1e-12
+
+
+def get_possible_worlds(references, probs, n_alternatives, workers=1,
+    seed=None, method='distance', condensed=False, block_budget=False):
   """ Gets possible worlds divided into base and alternative partitionings.
   
   Observations:
@@ -14,96 +28,426 @@ def get_possible_worlds(references, probs, n_alternatives):
       of probabilities from logistic regression. The alternative worlds 
       are obtained from random experiments for all pair of references'
       probabilities and applying kmedoids with k defined from the base.
+    - The method of the alternative worlds is one of _METHODS: 'distance' runs
+      kmedoids on the complement of the probabilities, while the others first
+      draw a symmetric Bernoulli adjacency matrix from the probabilities and
+      then cluster it with kmedoids ('kmedoids') or take its connected
+      components, found from the sampled edges with a sparse graph traversal
+      ('components') or with union-find ('union-find').
 
   Args:
     references: the list of references grouped in blocks.
     probs: a list with the probabilities matrices for each block.
     n_alternatives: the number of alternatives partitionings to be derived.
+    workers: the number of processes among which the blocks are sharded.
+    seed: an integer to seed the random generators or None.
+    method: the method of the alternative worlds, one of _METHODS.
+    condensed: whether the distances of each block are kept condensed.
+    block_budget: whether the number of samples of each block is proportional
+      to the entropy of its probabilities, as in iter_possible_worlds.
 
   Returns:
     A tuples (base_world, alternative_world), where each world is modeled as a
       list of list of integers, each coding a different cluster, grouped by
       blocks.
   """
-  probability_matrices = get_probability_matrices(references, probs)
-  base_partitioning = []
-  alternative_partitionings = []
-  k_block = []
-  for pm in probability_matrices:
-    distance_matrix = transform_distance_matrix(pm)
-    b_part_block, k = get_base_partitioning(distance_matrix)
-    k_block.append(k)
-    base_partitioning.append(b_part_block)
-  for _ in range(n_alternatives):
-    alternative_partitioning = []
-    for i, pm in enumerate(probability_matrices):
-      distance_matrix = transform_distance_matrix(pm)
-      a_part_block = get_alternative_partitioning(distance_matrix, k_block[i])
-      alternative_partitioning.append(a_part_block)
-    alternative_partitionings.append(alternative_partitioning)
-  return base_partitioning, alternative_partitionings
-
-
-def get_probability_matrices(references, probs):
+  base_world, alternative_worlds = iter_possible_worlds(references, probs,
+      n_alternatives, workers, seed, method=method, condensed=condensed,
+      block_budget=block_budget)
+  return base_world, list(alternative_worlds)
+
+
+def iter_possible_worlds(references, probs, n_alternatives, workers=1,
+    seed=None, batch_size=_BATCH_SIZE, method='distance', condensed=False,
+    block_budget=False):
+  """ Gets the base world and a generator of the alternative worlds.
+
+  Observations:
+    - The distance matrix of each block is computed once, as an array, and the
+      alternative worlds are sampled in batches of batch_size, with one call
+      per block for each batch, so that at most a batch of worlds is kept in
+      memory.
+    - With condensed, the distances of a dense block are kept as a condensed
+      vector, which is expanded only while the block is clustered, so that the
+      distances of all blocks take half the memory. The worlds are the same.
+    - With block_budget, each block is sampled a number of times proportional
+      to the entropy of its probabilities, as given by get_block_budgets, and
+      its samples are repeated in cycle along the worlds. A block whose
+      entropy is negligible, such as a block with a single reference, is not
+      sampled and keeps its base partitioning in every world.
+
+  Args:
+    references: the list of references grouped in blocks.
+    probs: a list with the probabilities matrices for each block.
+    n_alternatives: the number of alternatives partitionings to be derived.
+    workers: the number of processes among which the blocks are sharded.
+    seed: an integer to seed the random generators or None.
+    batch_size: the number of alternative worlds sampled in each batch.
+    method: the method of the alternative worlds, one of _METHODS.
+    condensed: whether the distances of each block are kept condensed.
+    block_budget: whether the number of samples of each block is proportional
+      to the entropy of its probabilities.
+
+  Returns:
+    A tuple (base_world, alternative_worlds), where base_world is a list of
+      partitionings, one for each block, and alternative_worlds is a generator
+      of worlds in the same format.
+  """
+  prob_matrices = get_probability_matrices(references, probs,
+      condensed=condensed)
+  budgets = get_block_budgets([get_entropy(pm) for pm in prob_matrices],
+      n_alternatives) if block_budget else None
+  distance_matrices = [transform_distance_matrix(pm, copy=False) for pm in
+      prob_matrices]
+  del prob_matrices
+  weights = [len(block) ** 2 for block in references]
+  base_blocks = aux.parallel_map(get_base_partitioning, [(dm,) for dm in
+      distance_matrices], workers, weights=weights)
+  base_world = [b_part_block for b_part_block, _ in base_blocks]
+  k_clusters = [k for _, k in base_blocks]
+  distance_matrices = [None if budgets and not budgets[i] else
+      get_sampled_matrix(dm, method) for i, dm in enumerate(distance_matrices)]
+  return base_world, iter_alternative_worlds(distance_matrices, k_clusters,
+      n_alternatives, workers, seed, batch_size, method, budgets, base_world)
+
+
+def iter_alternative_worlds(distance_matrices, k_clusters, n_alternatives,
+    workers=1, seed=None, batch_size=_BATCH_SIZE, method='distance',
+    budgets=None, base_world=None):
+  """ Generates the alternative worlds in batches.
+
+  Observations:
+    - A block with a budget of n_alternatives is sampled in each batch, as
+      without budgets. A block with a smaller budget keeps its samples, drawn
+      as the first batches need them, and repeats them in cycle. A block with
+      no budget takes its base partitioning, the same list in every world.
+    - Each block of each batch is sampled with its own seed, (seed, block,
+      batch start). Without seed, one is drawn from the operating system, so
+      that the batches and the blocks never share a random stream, even when
+      sampled by worker processes forked with the same random state.
+
+  Args:
+    distance_matrices: a list with the distance matrix of each block, as an
+      array or a condensed vector.
+    k_clusters: a list with the number of clusters of each block.
+    n_alternatives: the number of alternatives partitionings to be derived.
+    workers: the number of processes among which the blocks are sharded.
+    seed: an integer to seed the random generators or None, for a random
+      one.
+    batch_size: the number of alternative worlds sampled in each batch.
+    method: the method of the alternative worlds, one of _METHODS.
+    budgets: a list with the number of samples of each block or None, for
+      n_alternatives in all blocks.
+    base_world: the base partitioning of each block, required if some budget
+      is null.
+
+  Returns:
+    A generator of worlds, each a list of partitionings, one for each block.
+  """
+  if method not in _METHODS:
+    raise ValueError('Unknown method of alternative worlds: %s' % method)
+  if budgets is None:
+    budgets = [n_alternatives] * len(distance_matrices)
+  if seed is None:
+    seed = aux.get_random_seed()
+  samples = [[] for _ in distance_matrices]
+  for start in range(0, n_alternatives, batch_size):
+    size = min(batch_size, n_alternatives - start)
+    counts = [size if budget >= n_alternatives else min(budget, start + size) -
+        len(samples[i]) for i, budget in enumerate(budgets)]
+    sampled = [i for i, count in enumerate(counts) if count > 0]
+    block_batches = aux.parallel_map(get_alternative_partitionings,
+        [(distance_matrices[i], k_clusters[i], counts[i], [seed, i, start],
+        method) for i in sampled], workers,
+        weights=[get_size(distance_matrices[i]) ** 2 for i in sampled])
+    for i, a_part_blocks in zip(sampled, block_batches):
+      if budgets[i] >= n_alternatives:
+        samples[i] = a_part_blocks
+      else:
+        samples[i].extend(a_part_blocks)
+    for j in range(start, start + size):
+      yield [samples[i][j - start] if budget >= n_alternatives else
+          samples[i][j % budget] if budget else base_world[i] for i, budget in
+          enumerate(budgets)]
+
+
+def get_entropy(probability_matrix):
+  """ Gets the entropy of the correference of the pairs of a block.
+
+  Observations:
+    - The entropy of the pairs, taken as independent, bounds the entropy of
+      the partitionings of the block, and it is null when every probability
+      is 0 or 1, when all the samples are the same.
+
+  Args:
+    probability_matrix: an array, a condensed vector or a sparse matrix with
+      the probabilities of the block, as given by get_probability_matrices.
+
+  Returns:
+    A float with the sum of the binary entropies of the pairs, in bits.
+  """
+  if sparse.issparse(probability_matrix):
+    probs = sparse.triu(probability_matrix, 1).data
+  elif np.ndim(probability_matrix) == 1:
+    probs = probability_matrix
+  else:
+    probs = probability_matrix[np.triu_indices(len(probability_matrix), 1)]
+  probs = np.clip(np.asarray(probs, dtype=float), _ENTROPY_EPSILON,
+      1 - _ENTROPY_EPSILON)
+  return float(-(probs * np.log2(probs) + (1 - probs) *
+      np.log2(1 - probs)).sum())
+
+
+def get_block_budgets(entropies, n_alternatives):
+  """ Divides the alternative worlds among the blocks in proportion to their
+      entropies.
+
+  Observations:
+    - The block with the largest entropy is sampled in every world. A block
+      with entropy up to _DETERMINISTIC_ENTROPY is not sampled, and the other
+      ones are sampled at least once.
+
+  Args:
+    entropies: a list with the entropy of each block.
+    n_alternatives: the number of alternatives partitionings.
+
+  Returns:
+    A list with the number of samples of each block.
+  """
+  max_entropy = max(entropies) if entropies else 0.
+  return [0 if entropy <= _DETERMINISTIC_ENTROPY else min(n_alternatives,
+      max(1, int(np.ceil(n_alternatives * entropy / max_entropy)))) for
+      entropy in entropies]
+
+
+def get_block_worlds(block, probs, n_alternatives, seed=None, index=0,
+    method='distance', batch_size=_BATCH_SIZE):
+  """ Gets the base and alternative partitionings of a single block, as
+      iter_possible_worlds does for the block in position index.
+
+  Args:
+    block: the list of reference objects of the block.
+    probs: the probabilities of correference of the block.
+    n_alternatives: the number of alternatives partitionings to be derived.
+    seed: an integer to seed the random generators or None.
+    index: the position of the block, which is part of its seed.
+    method: the method of the alternative worlds, one of _METHODS.
+    batch_size: the number of alternative worlds sampled in each batch.
+
+  Returns:
+    A tuple (base, alternatives) with the base partitioning of the block and a
+      list with its alternative partitionings.
+  """
+  if method not in _METHODS:
+    raise ValueError('Unknown method of alternative worlds: %s' % method)
+  distance_matrix = transform_distance_matrix(get_probability_matrices([block],
+      [probs])[0], copy=False)
+  b_part_block, k = get_base_partitioning(distance_matrix)
+  distance_matrix = get_sampled_matrix(distance_matrix, method)
+  a_part_blocks = []
+  for start in range(0, n_alternatives, batch_size):
+    a_part_blocks += get_alternative_partitionings(distance_matrix, k,
+        min(batch_size, n_alternatives - start), None if seed is None else
+        [seed, index, start], method)
+  return b_part_block, a_part_blocks
+
+
+def get_sampled_matrix(distance_matrix, method):
+  """ Gets the distance matrix from which the alternative partitionings of a
+      block are sampled.
+
+  Observations:
+    - The sparse matrix of a pruned block is kept sparse for the methods that
+      sample edges, as the pruned pairs are never edges if their probability,
+      _PRUNED_PROBABILITY, is null. For the methods that cluster the whole
+      matrix, it is expanded into an array, so that pruning only saves memory
+      in the feature modeling of the block.
+
+  Args:
+    distance_matrix: an array, a condensed vector or a sparse matrix with the
+      distances of the block.
+    method: the method of the alternative worlds, one of _METHODS.
+
+  Returns:
+    The distance matrix itself or, if it has to be expanded, an array.
+  """
+  if sparse.issparse(distance_matrix) and (method not in _EDGE_METHODS or
+      _PRUNED_PROBABILITY):
+    return get_dense_matrix(distance_matrix, 1 - _PRUNED_PROBABILITY)
+  return distance_matrix
+
+
+def get_probability_matrices(references, probs, dtype=float,
+    condensed=False):
   """ Derives probability matrices from a list of probabilities.
 
   Observations:
     - The probabilities as well as the matrices are divided by block.
     - The order of the probabilities in each block is predefined, being sorted
       by lexicographical order on the tuple of references' ids.
+    - A block whose probabilities are a sparse upper triangular matrix, as
+      obtained with pruning, gives a symmetric sparse matrix, in which the
+      absent pairs have probability _PRUNED_PROBABILITY.
+    - With condensed, a dense block gives its probabilities as a condensed
+      vector, in the order of scipy's squareform, which is the order of the
+      probabilities already.
   
   Args:
     references: the list of reference objects grouped by block.
     probs: the list of probabilities of correferences for pair of references.
+    dtype: the type of the dense matrices, such as float or np.float32.
+    condensed: whether the dense blocks give condensed vectors instead of
+      matrices.
 
   Returns:
-    A list with matrices (three-depth nested lists), containing the
+    A list with arrays, condensed vectors or sparse matrices, containing the
       probability of correference for each block.
   """
   prob_matrices = []
   for i in range(len(references)):
-    block = references[i]
-    prob_matrix = [len(block) * [1.] for reference in block]
-    pair_count = 0
-    for j in range(len(block)):
-      reference_a = block[j]
-      for k in range(j+1, len(block)):
-        prob_matrix[j][k] = probs[i][pair_count]
-        prob_matrix[k][j] = probs[i][pair_count]
-        pair_count += 1
-    prob_matrices.append(prob_matrix)
+    if sparse.issparse(probs[i]):
+      prob_matrices.append(get_symmetric_matrix(probs[i]))
+    elif condensed:
+      prob_matrices.append(np.array(probs[i], dtype=dtype, ndmin=1))
+    else:
+      prob_matrices.append(get_probability_matrix(probs[i], len(references[i]),
+          dtype))
   return prob_matrices
 
 
-def transform_distance_matrix(similarity_matrix):
+def get_probability_matrix(probs, n_references, dtype=float):
+  """ Scatters the probabilities of a block into a symmetric matrix.
+
+  Args:
+    probs: the probabilities of the pairs of the block, in the order of
+      np.triu_indices.
+    n_references: the number of references of the block.
+    dtype: the type of the matrix.
+
+  Returns:
+    An array with the probabilities, with the diagonal filled with 1.
+  """
+  prob_matrix = np.ones((n_references, n_references), dtype=dtype)
+  rows, cols = np.triu_indices(n_references, 1)
+  prob_matrix[rows, cols] = probs
+  prob_matrix[cols, rows] = probs
+  return prob_matrix
+
+
+def get_size(matrix):
+  """ Gets the number of references of a matrix, which may be condensed.
+
+  Args:
+    matrix: an array, a condensed vector or a sparse matrix.
+
+  Returns:
+    An integer with the number of rows of the square matrix.
+  """
+  if sparse.issparse(matrix) or np.ndim(matrix) != 1:
+    return matrix.shape[0]
+  return int(round((1 + np.sqrt(1 + 8 * len(matrix))) / 2))
+
+
+def get_square_matrix(distance_matrix):
+  """ Expands a condensed distance vector into a square array.
+
+  Args:
+    distance_matrix: an array or a condensed vector with the distances, the
+      latter having null distances in the diagonal.
+
+  Returns:
+    An array with the square distance matrix, which is the input itself if it
+      is not condensed.
+  """
+  if np.ndim(distance_matrix) == 1:
+    return squareform(distance_matrix, checks=False)
+  return distance_matrix
+
+
+def get_symmetric_matrix(upper_matrix):
+  """ Builds a symmetric sparse probability matrix from its upper triangle.
+
+  Args:
+    upper_matrix: a sparse upper triangular matrix with the probabilities of
+      correference of the candidate pairs.
+
+  Returns:
+    A sparse matrix in CSR format with the candidate pairs in both triangles and
+      the diagonal filled with 1.
+  """
+  upper_matrix = upper_matrix.tocoo()
+  n = upper_matrix.shape[0]
+  rows = np.concatenate((upper_matrix.row, upper_matrix.col, np.arange(n)))
+  cols = np.concatenate((upper_matrix.col, upper_matrix.row, np.arange(n)))
+  data = np.concatenate((upper_matrix.data, upper_matrix.data, np.ones(n)))
+  return sparse.csr_matrix((data, (rows, cols)), shape=(n, n))
+
+
+def get_dense_matrix(sparse_matrix, fill_value):
+  """ Converts a sparse matrix into an array, filling the absent cells.
+
+  Args:
+    sparse_matrix: the sparse matrix.
+    fill_value: the value of the cells absent from the sparse matrix.
+
+  Returns:
+    An array with the dense matrix.
+  """
+  sparse_matrix = sparse_matrix.tocoo()
+  dense_matrix = np.full(sparse_matrix.shape, fill_value, dtype=float)
+  dense_matrix[sparse_matrix.row, sparse_matrix.col] = sparse_matrix.data
+  return dense_matrix
+
+
+def transform_distance_matrix(similarity_matrix, copy=True):
   """ Transforms a similarity matrix into a distance one by applying the
   complement of each cell.
 
+  Observations:
+    - For a sparse matrix, only the present cells are transformed, so that the
+      absent ones keep representing pruned pairs.
+    - Without copy, an array is transformed in place.
+
   Args:
-    similarity_matrix: a list of lists with the similarities.
+    similarity_matrix: a list of lists, an array, a condensed vector or a
+      sparse matrix with the similarities.
+    copy: whether the similarity matrix is kept unchanged.
 
   Returns:
-    A list of lists with representing the distance matrix.
+    An array, a condensed vector or, for a sparse similarity matrix, a sparse
+      matrix representing the distance matrix.
   """
-  distance_matrix = [[0.0] * len(row) for row in similarity_matrix]
-  for i in range(len(similarity_matrix)):
-    for j in range(len(similarity_matrix[i])):
-      distance_matrix[i][j] = 1 - similarity_matrix[i][j]
-  return distance_matrix
+  if sparse.issparse(similarity_matrix):
+    distance_matrix = similarity_matrix.tocsr(copy=copy)
+    distance_matrix.data = 1 - distance_matrix.data
+    return distance_matrix
+  if isinstance(similarity_matrix, np.ndarray) and not copy:
+    return np.subtract(1, similarity_matrix, out=similarity_matrix)
+  similarity_matrix = np.asarray(similarity_matrix, dtype=float)
+  return 1 - (similarity_matrix if similarity_matrix.ndim == 1 else
+      np.atleast_2d(similarity_matrix))
 
 
 def get_base_partitioning(distance_matrix, eps=0.5, min_samples=2):
   """ Gets the base partitioning from the distance matrix using DBScan
     algorithm.
 
+  Observations:
+    - A sparse distance matrix is clustered as is, the absent cells never being
+      neighbors.
+
   Args:
-    distance_matrix: a list of lists with the distances of references.
+    distance_matrix: a list of lists, an array, a condensed vector or a sparse
+      matrix with the distances of references.
 
   Returns:
     A list of integers from 0 to k - 1, each one representing a block for the
       reference represented by the index.
   """
-  labels = dbscan(np.array(distance_matrix), metric='precomputed', eps=eps, 
+  distance_matrix = distance_matrix.copy() if \
+      sparse.issparse(distance_matrix) else np.array(
+      get_square_matrix(distance_matrix), dtype=float, ndmin=2, copy=False)
+  labels = dbscan(distance_matrix, metric='precomputed', eps=eps, 
       min_samples=min_samples)
   next_label = max(labels[1]) + 1
   for i in range(len(labels[1])):
@@ -123,20 +467,211 @@ def get_random_matrix(probability_matrix):
 
   Observations:
     - For each cell in the matrix, a bernoulli experiment is performed
-      considering the respective probability.
+      considering the respective probability, the symmetric cells sharing the
+      same experiment.
 
   Args:
-    probability_matrix: a list of lists with the probabilites of correference.
+    probability_matrix: a list of lists or an array with the probabilites of
+      correference.
   
   Returns:
-    A list of lists representing a random matrix, with a binary number in each
-      cell.
+    An array representing a random matrix, with a binary number in each cell.
+  """
+  return get_random_matrices(probability_matrix, 1)[0]
+
+
+def get_random_matrices(probability_matrix, n_samples, random_state=None):
+  """ Gets several random matrices for a probability matrix at once.
+
+  Observations:
+    - The bernoulli experiments of all the samples are drawn in a single call,
+      only for the diagonal and upper triangle, which is then mirrored.
+
+  Args:
+    probability_matrix: a list of lists or an array with the probabilites of
+      correference.
+    n_samples: the number of random matrices.
+    random_state: a numpy RandomState object or None, for the global one.
+
+  Returns:
+    An array of shape (n_samples, n, n) with the binary random matrices.
+  """
+  random_sample = np.random.random_sample if random_state is None else \
+      random_state.random_sample
+  probability_matrix = np.asarray(probability_matrix, dtype=float)
+  n = len(probability_matrix)
+  rows, cols = np.triu_indices(n)
+  draws = random_sample((n_samples, len(rows))) < \
+      probability_matrix[rows, cols]
+  random_matrices = np.zeros((n_samples, n, n), dtype=np.uint8)
+  random_matrices[:, rows, cols] = draws
+  random_matrices[:, cols, rows] = draws
+  return random_matrices
+
+
+def get_edge_samples(probability_matrix, n_samples, random_state=None):
+  """ Gets several samples of the edges of the graph of correferences at once.
+
+  Observations:
+    - The bernoulli experiments of all the samples are drawn in a single call,
+      only for the pairs of the upper triangle with positive probability.
+    - The pairs are taken in row-major order, so that a sparse matrix gives the
+      same samples as its dense counterpart, whose absent cells are null.
+
+  Args:
+    probability_matrix: a list of lists, an array or a sparse matrix with the
+      probabilites of correference.
+    n_samples: the number of samples.
+    random_state: a numpy RandomState object or None, for the global one.
+
+  Returns:
+    A tuple (rows, cols, draws), where rows and cols are arrays with the pairs
+      of references and draws is a boolean array of shape (n_samples, n_pairs)
+      indicating the pairs sampled as edges.
+  """
+  random_sample = np.random.random_sample if random_state is None else \
+      random_state.random_sample
+  if sparse.issparse(probability_matrix):
+    upper_matrix = sparse.triu(probability_matrix, 1, format='csr')
+    upper_matrix.sort_indices()
+    upper_matrix = upper_matrix.tocoo()
+    positive = upper_matrix.data > 0
+    rows, cols = upper_matrix.row[positive], upper_matrix.col[positive]
+    probs = upper_matrix.data[positive]
+  else:
+    probability_matrix = np.asarray(probability_matrix, dtype=float)
+    rows, cols = np.nonzero(np.triu(probability_matrix > 0, 1))
+    probs = probability_matrix[rows, cols]
+  draws = random_sample((n_samples, len(rows))) < probs
+  return rows, cols, draws
+
+
+def get_alternative_partitionings(distance_matrix, k_clusters, n_alternatives,
+    seed=None, method='distance'):
+  """ Gets several alternative partitionings of a block from its distance
+    matrix.
+
+  Observations:
+    - With the 'distance' method, kmedoids is applied to the distance matrix.
+      Otherwise, random matrices are drawn from the probabilities, the
+      complement of the distances, and each is clustered either by kmedoids on
+      its complement ('kmedoids') or by its connected components ('components'
+      and 'union-find'). For the latter, only the sampled edges are drawn,
+      without building the matrices, and both engines give the same labels.
+    - A sparse distance matrix is only taken by the latter methods, for which
+      it is not expanded.
+
+  Args:
+    distance_matrix: an array, a condensed vector or a sparse matrix with the
+      distances between references.
+    k_clusters: the number of clusters.
+    n_alternatives: the number of alternatives partitionings to be derived.
+    seed: a list of integers to seed the random generators or None.
+    method: the method of the alternative worlds, one of _METHODS.
+
+  Returns:
+    A list of alternative partitionings, each a list of integers coding the
+      cluster of the reference given by the index.
+  """
+  if seed is not None:
+    random.seed(tuple(seed))
+    np.random.seed(seed)
+  if method in _EDGE_METHODS:
+    rows, cols, draws = get_edge_samples(transform_distance_matrix(
+        get_square_matrix(distance_matrix)), n_alternatives)
+    get_partitioning = get_components_labels if method == 'components' else \
+        get_union_find_labels
+    return [get_partitioning(get_size(distance_matrix), rows[edges],
+        cols[edges]) for edges in draws]
+  distance_matrix = np.asarray(get_square_matrix(distance_matrix), dtype=float)
+  if method == 'distance':
+    return list(kmedoids_runs(distance_matrix, k_clusters, n_alternatives))
+  random_matrices = get_random_matrices(1 - distance_matrix, n_alternatives)
+  return [get_alternative_partitioning(1 - random_matrix, k_clusters) for
+      random_matrix in random_matrices]
+
+
+def get_components_partitioning(adjacency_matrix):
+  """ Gets a partitioning from the connected components of an adjacency
+    matrix.
+
+  Args:
+    adjacency_matrix: a list of lists or an array with the binary adjacency
+      matrix of references.
+
+  Returns:
+    A list of integers, each represeting a differente cluster for the given
+      reference coded by the index.
+  """
+  rows, cols = np.nonzero(np.asarray(adjacency_matrix))
+  return get_components_labels(len(adjacency_matrix), rows, cols)
+
+
+def get_components_labels(n_references, rows, cols):
+  """ Gets the labels of the connected components of a graph of references
+    using a sparse graph traversal.
+
+  Observations:
+    - The labels are normalized as in kmedoids, the clusters being numbered
+      in order of their smallest reference index.
+
+  Args:
+    n_references: the number of references.
+    rows: an array with the first reference of each edge.
+    cols: an array with the second reference of each edge.
+
+  Returns:
+    A list of integers, each represeting a differente cluster for the given
+      reference coded by the index.
+  """
+  graph = sparse.coo_matrix((np.ones(len(rows), dtype=np.uint8), (rows, cols)),
+      shape=(n_references, n_references))
+  _, labels = csgraph.connected_components(graph, directed=False)
+  return get_labels(labels)
+
+
+def get_union_find_labels(n_references, rows, cols):
+  """ Gets the labels of the connected components of a graph of references
+    using union-find.
+
+  Observations:
+    - Each component is rooted at its smallest reference index, so the labels
+      are normalized as in kmedoids, from the roots instead of the medoids.
+
+  Args:
+    n_references: the number of references.
+    rows: an array with the first reference of each edge.
+    cols: an array with the second reference of each edge.
+
+  Returns:
+    A list of integers, each represeting a differente cluster for the given
+      reference coded by the index.
+  """
+  parent = range(n_references)
+  for a, b in zip(rows.tolist(), cols.tolist()):
+    root_a = find_root(parent, a)
+    root_b = find_root(parent, b)
+    if root_a < root_b:
+      parent[root_b] = root_a
+    elif root_b < root_a:
+      parent[root_a] = root_b
+  return get_labels([find_root(parent, a) for a in range(n_references)])
+
+
+def find_root(parent, element):
+  """ Finds the root of an element in a union-find forest, halving the path.
+
+  Args:
+    parent: a list with the parent of each element, modified in place.
+    element: the element index.
+
+  Returns:
+    The index of the root.
   """
-  random_matrix = [len(row) * [0.] for row in probability_matrix]
-  for i in range(len(probability_matrix)):
-    for j in range(len(probability_matrix[i])):
-      random_matrix[i][j] = np.random.binomial(n=1, p=probability_matrix[i][j])
-  return random_matrix
+  while parent[element] != element:
+    parent[element] = parent[parent[element]]
+    element = parent[element]
+  return element
 
 
 def get_alternative_partitioning(distance_matrix, k_clusters):
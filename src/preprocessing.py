@@ -34,14 +34,31 @@ def read_data(filename, labeled=False, limit=False):
   Returns:
     A list of lists of reference objects grouped by block.
   """
-  references = []
+  return list(iter_blocks(filename, labeled=labeled, limit=limit))
+
+
+def iter_blocks(filename, labeled=False, limit=False):
+  """ Reads the input file of references lazily, one block at a time.
+
+  Observations:
+    - The blocks are separated by empty lines and only the current block is
+      kept in memory.
+
+  Args:
+    filename: the name of the file with the references.
+    labeled: if the reference should be labeled to an entitiy or not.
+    limit: the maximum number of references read or False, for all.
+
+  Returns:
+    A generator of lists of reference objects, one for each block.
+  """
   curr_block = []
   count = 0
   input_file = open(filename, 'r')
   for line in input_file:
     line = line.strip()
     if not line:
-      references.append(curr_block)
+      yield curr_block
       curr_block = []
       continue
     elif limit and count >= limit:
@@ -55,10 +72,9 @@ def read_data(filename, labeled=False, limit=False):
       label=attrs[1].split('_')[0] if labeled else None)
     curr_block.append(reference)
     count += 1
-  if curr_block:
-    references.append(curr_block)
   input_file.close()
-  return references
+  if curr_block:
+    yield curr_block
 
 
 def get_corpus(references):
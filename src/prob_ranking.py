@@ -1,28 +1,139 @@
-from munkres import Munkres
 from math import sqrt
+from scipy.optimize import linear_sum_assignment
+import numpy as np
+import time
 
+from src import auxiliary as aux
 from src.models import Ranking
 
 
-def rank(references, base_partitioning, alternative_partitionings):
+_BATCH_SIZE = 100
+
+
+def rank(references, base_partitioning, alternative_partitionings, workers=1,
+    batch_size=_BATCH_SIZE):
   """ Ranks authors probabilistically.
 
+  Observations:
+    - Only the base ranking is built with the lists of references of its
+      authors. The alternative worlds are matched from their label vectors.
+    - The alternative worlds are consumed in batches of batch_size and only the
+      running sums of the displacements are kept, so that they may come from
+      a generator and the memory does not grow with their number.
+
   Args:
     references: a list of lists with the blocked references.
     base_partitioning: the base world for composing the deterministic ranking.
     alternative_partitionings: the alternative worlds for calculating the
-      uncertainty.
+      uncertainty, as a list or a generator.
+    workers: the number of processes among which the blocks are sharded for
+      matching.
+    batch_size: the number of alternative worlds matched at once.
 
   Returns:
     A probabilistic ranking with the base ranking plus uncertainties.
   """
+  return rank_adaptive(references, base_partitioning,
+      alternative_partitionings, workers=workers, batch_size=batch_size)[0]
+
+
+def rank_adaptive(references, base_partitioning, alternative_partitionings,
+    tolerance=None, time_budget=None, workers=1, batch_size=_BATCH_SIZE):
+  """ Ranks authors probabilistically, consuming alternative worlds only until
+      the uncertainties stabilize or a time budget is spent.
+
+  Observations:
+    - After each batch of worlds, the normalized uncertainties are compared to
+      the ones of the previous batch. The sampling stops when no position
+      changes by more than tolerance, in the discrete range from 0 to 10.
+    - The alternative worlds are better given as a generator, so that the
+      worlds after the stop are never sampled.
+
+  Args:
+    references: a list of lists with the blocked references.
+    base_partitioning: the base world for composing the deterministic ranking.
+    alternative_partitionings: the alternative worlds for calculating the
+      uncertainty, as a list or a generator, whose length is the maximum number
+      of worlds.
+    tolerance: the maximum change of a normalized uncertainty between batches
+      at convergence or None, for no convergence test.
+    time_budget: the maximum number of seconds spent or None, for no limit.
+    workers: the number of processes among which the blocks are sharded for
+      matching.
+    batch_size: the number of alternative worlds matched at once, between
+      stopping tests.
+
+  Returns:
+    A tuple (ranking, n_worlds, reason) with the probabilistic ranking, the
+      number of alternative worlds used and the stopping reason, which is
+      'converged', 'time' or 'exhausted', if all worlds were used.
+  """
+  time_i = time.time()
   base_ranking = get_ranking(references, base_partitioning, len)
-  alt_rankings = [get_ranking(references, alt_partitioning, len) for
-      alt_partitioning in alternative_partitionings]
-  matchings = match_rankings(base_ranking, alt_rankings)
-  uncertainty = normalize_uncertainties(calculate_uncertainties(matchings))
-  base_ranking.set_uncertainty(uncertainty)
-  return base_ranking
+  accumulator = UncertaintyAccumulator(base_partitioning)
+  uncertainty = None
+  reason = 'exhausted'
+  for batch in aux.iter_batches(alternative_partitionings, batch_size):
+    accumulator.add(batch, workers)
+    previous, uncertainty = uncertainty, normalize_uncertainties(
+        accumulator.get_uncertainties())
+    if tolerance is not None and previous is not None and max([abs(a - b) for
+        a, b in zip(uncertainty, previous)] or [0]) <= tolerance:
+      reason = 'converged'
+      break
+    if time_budget is not None and time.time() - time_i >= time_budget:
+      reason = 'time'
+      break
+  base_ranking.set_uncertainty(normalize_uncertainties(
+      accumulator.get_uncertainties()))
+  return base_ranking, accumulator.n_worlds, reason
+
+
+class UncertaintyAccumulator(object):
+  """ Accumulates the uncertainties of the base ranking over alternative
+      worlds, discarding each world after matching it.
+
+  Observations:
+    - The uncertainty of a position is the root mean square of its
+      displacements, with the base ranking counted as a world without
+      displacement, as in calculate_uncertainties. Only the sum of the
+      squared displacements of each position and the number of worlds are
+      kept, as integers, so that the result is exactly the batch one.
+  """
+
+  def __init__(self, base_partitioning):
+    """ Initializes the sums for a base partitioning.
+
+    Args:
+      base_partitioning: the base world, a list with the labels of each block.
+    """
+    self.base_partitioning = base_partitioning
+    positions, _ = get_partitioning_positions(base_partitioning)
+    self.sums = np.zeros(len(positions), dtype=np.int64)
+    self.n_worlds = 0
+
+  def add(self, alternative_partitionings, workers=1):
+    """ Matches alternative worlds and adds their displacements.
+
+    Args:
+      alternative_partitionings: a list with alternative worlds.
+      workers: the number of processes among which the blocks are sharded.
+    """
+    if not alternative_partitionings:
+      return
+    mapping = np.array(match_partitionings(self.base_partitioning,
+        alternative_partitionings, workers), dtype=np.int64)
+    displacements = mapping - np.arange(len(mapping))[:, np.newaxis]
+    self.sums += (displacements ** 2).sum(axis=1)
+    self.n_worlds += len(alternative_partitionings)
+
+  def get_uncertainties(self):
+    """ Gets the current uncertainties.
+
+    Returns:
+      A list of uncertainty indexed by the position in the base ranking.
+    """
+    return np.sqrt(self.sums / float(self.n_worlds + 1)).tolist()
 
 
 def get_ranking(references, partitioning, rank_function):
@@ -71,51 +182,169 @@ def get_authors(references, partitioning):
   return authors, blocks_start
 
 
-def match_rankings(ranking_a, rankings_b):
-  """ Match a list of rankings (b) against a base one (a).
+def match_partitionings(partitioning_a, partitionings_b, workers=1):
+  """ Matches a list of partitionings (b) against a base one (a), through
+      their rankings by number of references.
 
   Observations:
-    - Applies the Hungarian algorithm (Munkres) in the bipartite graph of
-      ranking_a and a ranking_b, only within the same block.
-    - The cost for a pair is the symmetric of the number of common references.
+    - Applies the Hungarian algorithm in the bipartite graph of the authors of
+      the base and of an alternative partitioning, only within the same block.
+      The cost for a pair is the symmetric of the number of common references.
+    - The blocks are independent, so they can be matched in parallel.
+    - A block may have a different number of authors in an alternative
+      partitioning. A base author left unmatched is then mapped to the
+      alternative author with most common references.
+    - The partitionings are taken as label vectors, with the labels of each
+      block from 0 to k - 1. The sizes of the authors come from a bincount of
+      the labels and the overlaps from their contingency table, so that no
+      author is built as a list of references.
+    - The same list of labels, as the base labels of a block reused in an
+      alternative world or a sample repeated in several worlds, becomes the
+      same array, so that match_labels solves it once.
+
+  Args:
+    partitioning_a: the base partitioning, a list with the labels of each
+      block.
+    partitionings_b: a list with alternative partitionings.
+    workers: the number of processes among which the blocks are sharded.
+
+  Returns:
+    A list of lists with the positions in alternative rankings for each position
+      in the base ranking.
+  """
+  arrays = {}
+  block_labels = [(get_label_array(labels_a, arrays), [get_label_array(
+      partitioning_b[i], arrays) for partitioning_b in partitionings_b]) for
+      i, labels_a in enumerate(partitioning_a)]
+  block_pairs = aux.parallel_map(match_labels, block_labels, workers,
+      weights=[len(labels_a) for labels_a, _ in block_labels])
+  return get_label_mapping(partitioning_a, partitionings_b, block_pairs)
+
+
+def get_label_mapping(partitioning_a, partitionings_b, block_pairs):
+  """ Maps the positions of the base ranking to the positions of the matched
+      authors in each alternative ranking, from the matched labels of each
+      block.
 
   Args:
-    ranking_a: the base ranking object.
-    rankings_b: a list with alterantive ranking objects.
+    partitioning_a: the base partitioning, a list with the labels of each
+      block.
+    partitionings_b: a list with alternative partitionings.
+    block_pairs: a list with the matched labels of each block, as returned by
+      match_labels for the alternative partitionings.
 
   Returns:
     A list of lists with the positions in alternative rankings for each position
       in the base ranking.
   """
-  n_blocks = len(ranking_a.blocks) - 1
-  mapping = [[] for _ in range(len(ranking_a.authors))]
-
-  for ranking_b in rankings_b:
-    for i in range(n_blocks):
-      blocks_start = ranking_a.blocks
-      authors_a = {a:refs for a, refs in ranking_a.authors.items() if a >= 
-          blocks_start[i] and a < blocks_start[i+1]} 
-      authors_b = {b:refs for b, refs in ranking_b.authors.items() if b >= 
-          blocks_start[i] and b < blocks_start[i+1]} 
-      k_authors = len(authors_a)
-      if k_authors == 1: # no matching necessary, only one author
-        author_a = authors_a.keys()[0]
-        author_b = authors_b.keys()[0]
-        mapping[ranking_a.ordering.index(author_a)] \
-            .append(ranking_b.ordering.index(author_b))
-        continue
-      cost_matrix = [[0] * k_authors for _ in range(k_authors)]
-      for a in authors_a:
-        for b in authors_b:
-          cost_matrix[a - blocks_start[i]][b - blocks_start[i]] = \
-              - len([r for r in authors_a[a] if r in authors_b[b]])
-      
-      m = Munkres()
-      block_pairs = m.compute(cost_matrix)
-      for a, b in block_pairs:
-        mapping[ranking_a.ordering.index(a + blocks_start[i])] \
-            .append(ranking_b.ordering.index(b + blocks_start[i]))
-  return mapping
+  positions_a, blocks_a = get_partitioning_positions(partitioning_a)
+  mapping = np.zeros((len(positions_a), len(partitionings_b)), dtype=int)
+  for j, partitioning_b in enumerate(partitionings_b):
+    positions_b, blocks_b = get_partitioning_positions(partitioning_b)
+    for i in range(len(partitioning_a)):
+      labels_a, labels_b = block_pairs[i][j]
+      mapping[positions_a[labels_a + blocks_a[i]], j] = \
+          positions_b[labels_b + blocks_b[i]]
+  return mapping.tolist()
+
+
+def get_label_array(labels, arrays):
+  """ Converts a list of labels into an array, once for each list object.
+
+  Args:
+    labels: the list of labels.
+    arrays: a dictionary with the lists already converted and their arrays,
+      indexed by object id, which keeps the lists alive.
+
+  Returns:
+    An array with the labels.
+  """
+  if id(labels) not in arrays:
+    arrays[id(labels)] = (labels, np.asarray(labels, dtype=int))
+  return arrays[id(labels)][1]
+
+
+def get_partitioning_positions(partitioning):
+  """ Gets the position of each author of a partitioning in its ranking by
+      number of references, without building the ranking.
+
+  Observations:
+    - The ordering is the one of Ranking, by decreasing size and then by
+      increasing author key.
+
+  Args:
+    partitioning: a list with the labels of each block.
+
+  Returns:
+    A tuple (positions, blocks_start) with an array with the position of each
+      author key and an array with the first author key of each block.
+  """
+  sizes = [np.bincount(np.asarray(labels, dtype=int)) for labels in
+      partitioning]
+  blocks_start = np.cumsum([0] + [len(block_sizes) for block_sizes in sizes])
+  sizes = np.concatenate(sizes) if sizes else np.zeros(0, dtype=int)
+  positions = np.zeros(len(sizes), dtype=int)
+  positions[np.argsort(-sizes, kind='mergesort')] = np.arange(len(sizes))
+  return positions, blocks_start
+
+
+def match_labels(labels_a, labels_b_list):
+  """ Matches the authors of a block in the base ranking against the authors of
+      the same block in each alternative ranking, from the labels of the
+      references.
+
+  Observations:
+    - The base labels themselves are matched by the identity, and an array
+      repeated in the list is matched only once.
+
+  Args:
+    labels_a: an array with the labels of the references in the base ranking.
+    labels_b_list: a list of arrays with the labels of the same references, in
+      the same order, in each alternative ranking.
+
+  Returns:
+    A list with a tuple (labels_a, labels_b) of arrays with the matched labels
+      for each alternative ranking, with one pair for each base label.
+  """
+  k_a = labels_a.max() + 1 if len(labels_a) else 0
+  solved = {id(labels_a): (np.arange(k_a), np.arange(k_a))}
+  block_pairs = []
+  for labels_b in labels_b_list:
+    if id(labels_b) not in solved:
+      k_b = labels_b.max() + 1 if len(labels_b) else 0
+      if k_a == 1 and k_b == 1: # no matching necessary
+        solved[id(labels_b)] = (np.zeros(1, dtype=int), np.zeros(1,
+            dtype=int))
+      else:
+        contingency = np.bincount(labels_a * k_b + labels_b, minlength=k_a *
+            k_b).reshape(k_a, k_b)
+        solved[id(labels_b)] = match_contingency(contingency)
+    block_pairs.append(solved[id(labels_b)])
+  return block_pairs
+
+
+def match_contingency(contingency):
+  """ Solves the assignment of maximum overlap from a contingency table.
+
+  Observations:
+    - If there are more rows than columns, the rows left unassigned are
+      matched to the column with the largest overlap, the first in case of
+      ties.
+
+  Args:
+    contingency: an array with the number of common references of each pair of
+      authors.
+
+  Returns:
+    A tuple (rows, cols) of arrays with the matched pairs, with one pair for
+      each row.
+  """
+  rows, cols = linear_sum_assignment(-contingency)
+  if len(rows) < contingency.shape[0]:
+    unmatched = np.setdiff1d(np.arange(contingency.shape[0]), rows)
+    rows = np.concatenate((rows, unmatched))
+    cols = np.concatenate((cols, contingency[unmatched].argmax(axis=1)))
+  return rows, cols
 
 
 def calculate_uncertainties(matchings):
@@ -147,9 +376,10 @@ def normalize_uncertainties(uncertainties):
     uncertainties: the real uncertainty values.
 
   Returns:
-    A list with normalized and discretized uncertainties.
+    A list with normalized and discretized uncertainties, which are null for a
+      ranking with a single author.
   """
-  max_unc = len(uncertainties) - 1
+  max_unc = max(len(uncertainties) - 1, 1)
   new_uncertainties = []
   for unc in uncertainties:
     new_uncertainties.append(int(round(unc/max_unc * 10)))
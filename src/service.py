@@ -0,0 +1,164 @@
+""" Module of the scoring service, which loads a model artifact once and ranks
+    the blocks of references it receives as JSON lines.
+
+Run as follows, from the project folder, after saving the artifact with the -a
+option of src.main:
+$ python -m src.service cache/model.pkl < requests.jsonl > responses.jsonl
+
+Each request is a JSON object in a line, as follows, in which the strings of
+the references are preprocessed as in the input files, the name and the title
+of each reference are required and the other fields are optional:
+{"id": 1, "references": [{"name": "e rundensteiner", "title": "spatial join",
+  "coauthors": ["y huang"], "venue": "geoinformatica"}], "alternatives": 10,
+  "seed": 1, "method": "distance"}
+
+Each response is a JSON object in a line with the same id, the probabilities of
+correference of the pairs of references, in lexicographic order, and the
+ranking of the authors of the block, or with an error message.
+"""
+
+import argparse
+import json
+import sys
+
+from src import learning as lear
+from src import modeling as mod
+from src import partitioning as part
+from src import prob_ranking as prob_rank
+from src.models import Reference
+
+
+_ITERATIONS = 10
+_METHOD = 'distance'
+
+
+class Scorer(object):
+  """ Scores and ranks blocks of references with a loaded model artifact.
+
+  Observations:
+    - The name words absent from the idf of the artifact get the maximum idf,
+      as the rarest words of the corpus. Each request is scored with its own
+      SoftTfidf, so that the idf and the caches of names never grow across
+      requests.
+  """
+
+  def __init__(self, pred, idf):
+    """ Initializes the scorer.
+
+    Args:
+      pred: the predictor object (from sklearn) with the logistic regression.
+      idf: the inverse document frequence of the names, as returned by
+        modeling.get_idf.
+    """
+    self.pred = pred
+    self.idf = idf
+
+  def get_probabilities(self, block):
+    """ Gets the probabilities of correference of the pairs of a block.
+
+    Args:
+      block: the list of reference objects.
+
+    Returns:
+      An array with the probabilities, in lexicographic order of the pairs.
+    """
+    return lear.predict_block(self.pred, mod.model_block(block,
+        mod.SoftTfidf(self.idf)))
+
+  def rank(self, block, n_alternatives=_ITERATIONS, seed=None,
+      method=_METHOD):
+    """ Ranks the authors of a block.
+
+    Args:
+      block: the list of reference objects.
+      n_alternatives: the number of alternatives worlds.
+      seed: an integer to seed the random generators or None.
+      method: the method of the alternative worlds, one of
+        partitioning._METHODS.
+
+    Returns:
+      A tuple (probs, ranking) with the probabilities of the pairs and the
+        probabilistic ranking of the block.
+    """
+    probs = self.get_probabilities(block)
+    b_part_block, a_part_blocks = part.get_block_worlds(block, probs,
+        n_alternatives, seed, 0, method)
+    ranking = prob_rank.rank([block], [b_part_block], [[a_part_block] for
+        a_part_block in a_part_blocks])
+    return probs, ranking
+
+  def handle(self, request):
+    """ Answers a request.
+
+    Args:
+      request: a dictionary with the request, as described in the module.
+
+    Returns:
+      A dictionary with the response.
+
+    Raises:
+      ValueError: if the request has no references or if a reference has no
+        name or no title words, as the similarity of two empty titles is
+        undefined in feature modeling.
+    """
+    if not request.get('references'):
+      raise ValueError('Request without references')
+    for i, ref in enumerate(request['references']):
+      if not ref.get('name'):
+        raise ValueError('Reference %d without name' % i)
+      if not mod.get_words(encode(ref.get('title') or '')):
+        raise ValueError('Reference %d without title words' % i)
+    block = [Reference(refid=i, name=encode(ref['name']),
+        title=encode(ref['title']), coauthors=[encode(coauthor) for
+        coauthor in ref.get('coauthors', [])], venue=encode(ref.get('venue',
+        '')), label=None) for i, ref in enumerate(request['references'])]
+    probs, ranking = self.rank(block, request.get('alternatives',
+        _ITERATIONS), request.get('seed'), request.get('method', _METHOD))
+    authors = [{'name': ranking.get_name(ranking.authors[author]),
+        'references': [ref.refid for ref in ranking.authors[author]],
+        'uncertainty': ranking.uncertainty[pos]} for pos, author in
+        enumerate(ranking.ordering)]
+    return {'id': request.get('id'), 'probabilities': probs.tolist(),
+        'ranking': authors}
+
+
+def encode(string):
+  """ Encodes a string decoded from JSON in UTF-8, as read from the input
+      files. """
+  return string.encode('utf-8') if isinstance(string, unicode) else string
+
+
+def serve(scorer, input_file, output_file):
+  """ Answers the requests of an input stream, one JSON object per line, until
+      its end.
+
+  Observations:
+    - A failed request is answered with its error message, and the service
+      goes on with the next one.
+
+  Args:
+    scorer: the Scorer object.
+    input_file: the stream of requests.
+    output_file: the stream of responses, flushed after each response.
+  """
+  for line in iter(input_file.readline, ''):
+    if not line.strip():
+      continue
+    request = None
+    try:
+      request = json.loads(line)
+      response = scorer.handle(request)
+    except Exception as error:
+      response = {'id': request.get('id') if isinstance(request, dict) else
+          None, 'error': str(error)}
+    output_file.write(json.dumps(response) + '\n')
+    output_file.flush()
+
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description='Ranks blocks of references '
+      'received as JSON lines in the standard input.')
+  parser.add_argument('model_file', help='model artifact saved by src.main')
+  args = parser.parse_args()
+  pred, idf = lear.load_model(args.model_file)
+  serve(Scorer(pred, idf), sys.stdin, sys.stdout)
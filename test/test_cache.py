@@ -0,0 +1,97 @@
+""" Unit testing for the cache module.
+
+    Run in the project folder as follows:
+    python -m test.test_cache
+"""
+
+import unittest
+import time
+import os
+import shutil
+
+from src import cache as sc
+
+
+class StageCacheTestCase(unittest.TestCase):
+  """ Class with test cases for the stage cache. """
+
+  def setUp(self):
+    """ Creates the cache directory and a counter of computations. """
+    self.cachedir = 'test/cache%d' % time.time()
+    self.calls = []
+
+  def tearDown(self):
+    """ Deletes all used files and structures. """
+    if os.path.isdir(self.cachedir):
+      shutil.rmtree(self.cachedir)
+
+  def compute(self, value):
+    """ Records a computation and returns its result. """
+    self.calls.append(value)
+    return {'value': [value] * 100}
+
+  def test_fetch(self):
+    """ Tests that a result is computed only once per key. """
+    cache = sc.StageCache(self.cachedir)
+    key = cache.get_key('stage', 1, 'a')
+    self.assertEquals(cache.get_key('stage', 1, 'a'), key)
+    self.assertNotEquals(cache.get_key('stage', 2, 'a'), key)
+    self.assertEquals(cache.fetch('stage', key, self.compute, 1),
+        {'value': [1] * 100})
+    self.assertEquals(cache.fetch('stage', key, self.compute, 1),
+        {'value': [1] * 100})
+    self.assertEquals(self.calls, [1])
+    self.assertEquals(cache.report(), 'stage: 1 hits, 1 misses')
+
+  def test_get_key_version(self):
+    """ Tests that the keys change with the format version. """
+    cache = sc.StageCache()
+    key = cache.get_key('stage', 1)
+    version = sc._FORMAT_VERSION
+    sc._FORMAT_VERSION = version + 1
+    try:
+      self.assertNotEquals(cache.get_key('stage', 1), key)
+    finally:
+      sc._FORMAT_VERSION = version
+    self.assertEquals(cache.get_key('stage', 1), key)
+
+  def test_disabled(self):
+    """ Tests that a cache without directory always computes. """
+    cache = sc.StageCache()
+    key = cache.get_key('stage', 1)
+    cache.fetch('stage', key, self.compute, 1)
+    cache.fetch('stage', key, self.compute, 1)
+    self.assertEquals(self.calls, [1, 1])
+
+  def test_evict(self):
+    """ Tests that the least recently used results are evicted. """
+    cache = sc.StageCache(self.cachedir)
+    cache.fetch('stage', cache.get_key('stage', 1), self.compute, 1)
+    size = os.path.getsize(cache.get_filename('stage', cache.get_key('stage',
+        1)))
+    cache.max_size = 2 * size
+    past = time.time() - 10
+    os.utime(cache.get_filename('stage', cache.get_key('stage', 1)), (past,
+        past))
+    cache.fetch('stage', cache.get_key('stage', 2), self.compute, 2)
+    cache.fetch('stage', cache.get_key('stage', 3), self.compute, 3)
+    self.assertEquals(sorted(os.listdir(self.cachedir)), sorted([
+        'stage-%s.pkl.z' % cache.get_key('stage', 2),
+        'stage-%s.pkl.z' % cache.get_key('stage', 3)]))
+
+  def test_get_file_digest(self):
+    """ Tests that the digest changes with the content of a file. """
+    filename = self.cachedir + '.dat'
+    data_file = open(filename, 'w')
+    data_file.write('a')
+    data_file.close()
+    digest = sc.get_file_digest(filename)
+    data_file = open(filename, 'a')
+    data_file.write('b')
+    data_file.close()
+    self.assertNotEquals(sc.get_file_digest(filename), digest)
+    os.remove(filename)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,96 @@
+""" Unit testing for the feature_store module.
+
+    Run in the project folder as follows:
+    python -m test.test_feature_store
+"""
+
+import unittest
+import time
+import os
+import shutil
+
+from src import feature_store as fs
+from src import modeling as mod
+from src import preprocessing as pre
+
+
+class SampleTestCase(unittest.TestCase):
+  """ Class with a sample test case from the used data. """
+
+  def setUp(self):
+    """ Creates the file containing the references sample. """
+    self.testfilename = 'test/testfile%d' % time.time()
+    writetestfile = open(self.testfilename, 'w')
+    writetestfile.write(
+        '0<>81_0<>e rundensteiner:y huang<>geoinformatica<>m jones<>symbol '
+            'intersect detect method improv spatial intersect join<>\n'
+        '1<>81_1<>e rundensteiner:h kuno:p marron:v taube:y ra<>sigmod intern '
+            'manag data<>matthew c jones<>improv spatial intersect join symbol '
+            'intersect detect<>\n'
+        '2<>81_2<>e rundensteiner:y huang<>ssd symposium larg spatial '
+            'databas<>matthew c jones<>view materi techniqu complex hierarch '
+            'object<>\n\n'
+
+        '0<>185_0<>l berg<>sigucc special interest group univers comput '
+            'servic<>mike w miller<>domin draw bipartit graph<>\n'
+        '1<>185_1<>undefined<>sigucc special interest group univers comput '
+            'servic<>mike w miller<>rel compromis statist databas<>\n\n'
+
+        '0<>94_0<>d kung:j samuel:j gao:p hsia:y toyoshima<>ieee softwar<>c '
+            'chen<>formal approach scenario analysi<>\n\n'
+
+        '0<>69_0<>undefined<>acl meet the associ comput linguist<>jane j '
+            'robinson<>discours code clue context<>\n'
+        '1<>69_1<>undefined<>cooper interfac inform system<>jane j robinson<>'
+            'diagram grammar dialogu<>\n\n'
+
+        '0<>0_0<>a gonzalez:a hamid:c overstreet:h wahab:j wild:k maly:s ghanem'
+            ':x zhu<>acm journal educ resourc comput<>a gupta<>iri h java '
+            'distanc educ<>\n\n'
+
+        '4<>43_1<>y patt<>proceed the th ieee intern symposium high perform '
+            'comput architectur hpca intern symposium high perform comput '
+            'architectur talk slide<>mary d brown<>intern redund remod.ent '
+            'limit bypass support pipelin adder regist file<>\n\n')
+    writetestfile.close()
+
+    self.storedir = 'test/features%d' % time.time()
+
+  def tearDown(self):
+    """ Deletes all used files and structures. """
+    os.remove(self.testfilename)
+    shutil.rmtree(self.storedir)
+
+  def test_stored_vectors(self):
+    """ Tests that stored vectors are mapped back unchanged. """
+    references, corpus = pre.get_input(self.testfilename)
+    store = fs.FeatureStore(self.storedir)
+    truth = mod.model_arrays(references, corpus)
+    computed = mod.model_arrays(references, corpus, store=store)
+    self.assertEquals(store.hits, 0)
+    self.assertEquals(store.misses, 3)
+    stored = mod.model_arrays(references, corpus, store=store)
+    self.assertEquals(store.hits, 3)
+    self.assertEquals(store.misses, 3)
+    for block, computed_block, truth_block in zip(stored, computed, truth):
+      self.assertEquals(block.tolist(), truth_block.tolist())
+      self.assertEquals(computed_block.tolist(), truth_block.tolist())
+
+  def test_get_key(self):
+    """ Tests that the key changes with the content of the block. """
+    references, corpus = pre.get_input(self.testfilename)
+    store = fs.FeatureStore(self.storedir)
+    idf = mod.get_idf(corpus)
+    block = references[0]
+    key = store.get_key(block, idf)
+    self.assertEquals(store.get_key(block, idf), key)
+    self.assertNotEquals(store.get_key(block, idf, mod.get_pairs(len(block))),
+        key)
+    self.assertNotEquals(store.get_key(block, dict(idf,
+        **{'@max_idf': idf['@max_idf'] + 1})), key)
+    block[0].venue = 'sigmod'
+    self.assertNotEquals(store.get_key(block, idf), key)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,103 @@
+""" Unit testing for the incremental module.
+
+    Run in the project folder as follows:
+    python -m test.test_incremental
+"""
+
+import unittest
+
+from src import incremental as inc
+from src import learning as lear
+from src import partitioning as part
+from src import preprocessing as pre
+from src import prob_ranking as prob_rank
+from test.test_cases import SampleTestCase
+
+
+class SampleTestCaseIncremental(SampleTestCase):
+  """ Using the sample test case for testing the incremental module. """
+
+  def get_predictor(self):
+    """ Trains a predictor in the sample test case. """
+    references, corpus = pre.get_input(self.testfilename, labeled=True)
+    references = [references[0], references[1], references[3]] + \
+        [references[2] + references[4] + references[5]]
+    return lear.train(references, corpus)
+
+  def assertMatricesAlmostEqual(self, matrices, truth):
+    """ Compares lists of probability matrices. """
+    self.assertEqual(len(matrices), len(truth))
+    for matrix, truth_matrix in zip(matrices, truth):
+      for row, truth_row in zip(matrix.tolist(), truth_matrix):
+        for value, truth_value in zip(row, truth_row):
+          self.assertAlmostEqual(value, truth_value)
+
+  def test_add_all(self):
+    """ Tests that adding all references at once equals the batch pipeline. """
+    pred = self.get_predictor()
+    ranker = inc.IncrementalRanker(pred, 3, seed=1)
+    self.assertEqual(ranker.add_file(self.testfilename), range(6))
+    self.assertEqual([len(block) for block in ranker.references], [3, 2, 1, 2,
+        1, 1])
+    references, corpus = pre.get_input(self.testfilename)
+    probs = lear.test(references, corpus, pred)
+    self.assertMatricesAlmostEqual(ranker.prob_matrices,
+        part.get_probability_matrices(references, probs))
+    base_world, alt_worlds = part.get_possible_worlds(references, probs, 3,
+        seed=1)
+    self.assertEqual(ranker.base_world, base_world)
+    ranking = ranker.rank()
+    truth = prob_rank.rank(references, base_world, alt_worlds)
+    self.assertEqual(ranking.ordering, truth.ordering)
+    self.assertEqual(ranking.uncertainty, truth.uncertainty)
+
+  def test_add_increments(self):
+    """ Tests that only the blocks with new references change, the blocks
+        with known keys being extended. """
+    pred = self.get_predictor()
+    references, corpus = pre.get_input(self.testfilename)
+    truth = part.get_probability_matrices(references, lear.test(references,
+        corpus, pred))
+    first = [references[0][:1], references[1]]
+    second = [references[0][1:]] + references[2:]
+    ranker = inc.IncrementalRanker(pred, 2, seed=1)
+    self.assertEqual(ranker.add(first, ['jones', 'miller']), [0, 1])
+    previous = ranker.prob_matrices[1]
+    self.assertEqual(ranker.add(second, ['jones'] + [None] * 4), [0, 2, 3, 4,
+        5])
+    self.assertIs(ranker.prob_matrices[1], previous)
+    self.assertEqual([len(block) for block in ranker.references], [3, 2, 1, 2,
+        1, 1])
+    self.assertEqual([ref.refid for block in ranker.references for ref in
+        block], [0, 3, 4, 1, 2, 5, 6, 7, 8, 9])
+    self.assertMatricesAlmostEqual(ranker.prob_matrices[:1] +
+        ranker.prob_matrices[2:], truth[:1] + truth[2:])
+    ranking = ranker.rank()
+    self.assertEqual(len(ranking.uncertainty), len(ranking.ordering))
+    self.assertEqual(ranker.add([references[3][:1]], ['miller']), [1])
+    self.assertEqual(len(ranker.references[1]), 3)
+    self.assertEqual(ranker.add([references[3][:1]]), [6])
+    refreshed = inc.IncrementalRanker(pred, 2, seed=1, refresh=True)
+    refreshed.add(first, ['jones', 'miller'])
+    refreshed.add(second, ['jones'] + [None] * 4)
+    self.assertMatricesAlmostEqual(refreshed.prob_matrices[:1] +
+        refreshed.prob_matrices[2:], truth[:1] + truth[2:])
+
+  def test_rank_matches_batch(self):
+    """ Tests that the uncertainties from the matched labels of each block
+        equal the ones of the batch ranking, after several additions. """
+    pred = self.get_predictor()
+    references, _ = pre.get_input(self.testfilename)
+    ranker = inc.IncrementalRanker(pred, 4, seed=2, method='union-find')
+    ranker.add(references[:3], range(3))
+    ranker.add(references[3:], range(3, 6))
+    ranking = ranker.rank()
+    alt_worlds = [[a_part_blocks[j] for a_part_blocks in ranker.alt_blocks] for
+        j in range(4)]
+    truth = prob_rank.rank(ranker.references, ranker.base_world, alt_worlds)
+    self.assertEqual(ranking.ordering, truth.ordering)
+    self.assertEqual(ranking.uncertainty, truth.uncertainty)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -4,8 +4,11 @@
     python -m test.test_learning
 """
 
+import os
 import unittest
 
+import numpy as np
+
 from src import learning as lear
 from src import modeling as mod
 from src import preprocessing as pre
@@ -42,8 +45,71 @@ class SampleTestCaseLearning(SampleTestCase):
     pred = lear.train(references, corpus)
     sim_vectors, classes = mod.model(references, corpus, labeled=True)
     self.assertEqual([round(prob) for prob in 
-        sum(lear.test(references, corpus, pred), [])], classes)
+        np.concatenate(lear.test(references, corpus, pred))], classes)
+
+  def test_predict_blocks(self):
+    """ Tests that the chunked prediction of all blocks equals the prediction
+        of each block. """
+    references, corpus = pre.get_input(self.testfilename, labeled=True)
+    references = [references[0], references[1], references[3]] + [references[2] 
+        + references[4] + references[5]]
+    pred = lear.train(references, corpus)
+    sim_vectors = mod.model_arrays(references, corpus)
+    probs = lear.predict_blocks(pred, sim_vectors, chunk_size=2)
+    self.assertEqual(len(probs), len(references))
+    for block_probs, block_vectors in zip(probs, sim_vectors):
+      self.assertTrue(np.allclose(block_probs, lear.predict_block(pred,
+          block_vectors)))
+
+
+  def test_iter_test(self):
+    """ Tests that the streamed probabilities equal the ones of the test
+        phase. """
+    references, corpus = pre.get_input(self.testfilename, labeled=True)
+    references = [references[0], references[1], references[3]] + [references[2] 
+        + references[4] + references[5]]
+    pred = lear.train(references, corpus)
+    probs = lear.test(references, corpus, pred)
+    result = list(lear.iter_test(references, mod.get_idf(corpus), pred))
+    self.assertEqual([block for block, _ in result], references)
+    for (_, block_probs), truth in zip(result, probs):
+      self.assertTrue(np.allclose(block_probs, truth))
+
+  def test_testing_pruned(self):
+    """ Tests the test phase with pruning of pairs, which for small blocks
+        compares all the pairs. """
+    references, corpus = pre.get_input(self.testfilename, labeled=True)
+    references = [references[0], references[1], references[3]] + [references[2] 
+        + references[4] + references[5]]
+    pred = lear.train(references, corpus)
+    probs = lear.test(references, corpus, pred)
+    pruned_probs = lear.test(references, corpus, pred, prune=True)
+    for block, block_probs, pruned_block_probs in zip(references, probs,
+        pruned_probs):
+      rows, cols = mod.get_pairs(len(block))
+      self.assertEqual(pruned_block_probs.toarray()[rows, cols].tolist(),
+          block_probs.tolist())
 
 
+  def test_save_model(self):
+    """ Tests that a saved model artifact is loaded back and that other
+        versions are refused. """
+    references, corpus = pre.get_input(self.testfilename, labeled=True)
+    references = [references[0], references[1], references[3]] + [references[2] 
+        + references[4] + references[5]]
+    pred = lear.train(references, corpus)
+    filename = self.testfilename + '.model'
+    version = lear._MODEL_VERSION
+    try:
+      lear.save_model(filename, pred, mod.get_idf(corpus))
+      loaded_pred, idf = lear.load_model(filename)
+      self.assertEqual(idf, mod.get_idf(corpus))
+      self.assertEqual(loaded_pred.coef_.tolist(), pred.coef_.tolist())
+      lear._MODEL_VERSION += 1
+      self.assertRaises(ValueError, lear.load_model, filename)
+    finally:
+      lear._MODEL_VERSION = version
+      os.remove(filename)
+
 if __name__ == '__main__':
   unittest.main()
@@ -260,6 +260,18 @@ class SampleTestCase(unittest.TestCase):
           self.assertEquals(round(rules[author_a][author_b], 4), 
               round(truth[i][author_a][author_b], 4))
 
+  def test_coauthorship_similarity_matrix(self):
+    """ Tests the function coauthorship_similarity_matrix against the pairwise
+        coauthorship_similarity. """
+    references = pre.read_data(self.testfilename)
+    for block in references:
+      rules = mod.get_coauthorship_rules(block)
+      similarity = mod.coauthorship_similarity_matrix(block).toarray()
+      for i in range(len(block)):
+        for j in range(len(block)):
+          self.assertAlmostEquals(similarity[i, j],
+              mod.coauthorship_similarity(block[i], block[j], rules))
+
   def test_modeling_unlabeled(self):
     """ Tests the correct composition of the result in modeling function, 
         since the singular functions are tested. For unlabeled case. """
@@ -285,6 +297,65 @@ class SampleTestCase(unittest.TestCase):
         [1, 1, 0, 1, 0, 0])
     self.assertEquals(result, truth)
   
+  def test_model_arrays_unlabeled(self):
+    """ Tests that the batch feature engine matches the modeling function. For
+        unlabeled case. """
+    references, corpus = pre.get_input(self.testfilename)
+    truth = mod.model(references, corpus)
+    sim_vectors = mod.model_arrays(references, corpus)
+    self.assertEquals(len(sim_vectors), len(truth))
+    for block, truth_block in zip(sim_vectors, truth):
+      self.assertEquals(block.shape, (len(truth_block), 5))
+      for vector, truth_vector in zip(block.tolist(), truth_block):
+        for value, truth_value in zip(vector, truth_vector):
+          self.assertAlmostEquals(value, truth_value)
+
+  def test_model_arrays_labeled(self):
+    """ Tests that the batch feature engine matches the modeling function. For
+        labeled case. """
+    references, corpus = pre.get_input(self.testfilename, labeled=True)
+    sim_vectors, classes = mod.model_arrays([references[0] + references[2]],
+        corpus, labeled=True)
+    truth = [(0.6506800700017669, 2.5, 1, 0.8571428571428571, 0),
+        (0.6506800700017669, 3.5, 2, 0.0, 0),
+        (0.0, 0, 0, 0.0, 0),
+        (1.0, 4.5, 1, 0.0, 0),
+        (0.0, 0, 0, 0.0, 0),
+        (0.0, 0, 0, 0.0, 0)]
+    for vector, truth_vector in zip(sim_vectors[0].tolist(), truth):
+      for value, truth_value in zip(vector, truth_vector):
+        self.assertAlmostEquals(value, truth_value)
+    self.assertEquals(classes.tolist(), [1, 1, 0, 1, 0, 0])
+
+  def test_get_pairs(self):
+    """ Tests the lexicographic ordering of pairs. """
+    rows, cols = mod.get_pairs(4)
+    self.assertEquals(zip(rows, cols), [(0, 1), (0, 2), (0, 3), (1, 2), (1, 3),
+        (2, 3)])
+
+  def test_get_candidate_pairs(self):
+    """ Tests the candidate pairs from the inverted indexes. """
+    references = pre.read_data(self.testfilename)
+    block = references[0] + references[1]
+    rows, cols = mod.get_candidate_pairs(block, min_size=0)
+    self.assertEquals(zip(rows, cols), [(0, 1), (0, 2), (1, 2), (3, 4)])
+    rows, cols = mod.get_candidate_pairs(block)
+    self.assertEquals(zip(rows, cols), zip(*mod.get_pairs(len(block))))
+
+  def test_encode_block(self):
+    """ Tests the encoding of a block into ids and sparse matrices. """
+    references = pre.read_data(self.testfilename)
+    name_ids, names, coauthor_matrix, coauthors, title_matrix, venue_ids = \
+        mod.encode_block(references[0])
+    self.assertEquals(name_ids.tolist(), [0, 1, 1])
+    self.assertEquals(names, ['m jones', 'matthew c jones'])
+    self.assertEquals(venue_ids.tolist(), [0, 1, 2])
+    self.assertEquals(coauthors, ['e rundensteiner', 'y huang', 'h kuno',
+        'p marron', 'v taube', 'y ra'])
+    self.assertEquals(coauthor_matrix.toarray().tolist(), [[1, 1, 0, 0, 0, 0],
+        [1, 0, 1, 1, 1, 1], [1, 1, 0, 0, 0, 0]])
+    self.assertEquals(title_matrix.sum(axis=1).ravel().tolist(), [[7, 6, 6]])
+
   def test_close(self):
     """ Tests the close function. """
     close = mod.close(mod._STFIDF_THRESHOLD,
@@ -300,6 +371,33 @@ class SampleTestCase(unittest.TestCase):
     truth = 'matt'
     self.assertEquals(sim, truth)
 
+  def test_overlap(self):
+    """ Tests the overlap function and its integer kernel. """
+    self.assertEquals(mod.overlap(['e rundensteiner', 'y huang'],
+        ['e rundensteiner', 'h kuno', 'y huang']), 2)
+    self.assertEquals(mod.overlap([], ['h kuno']), 0)
+    self.assertEquals(mod.intersection_size([1, 3, 3, 7], [0, 3, 7, 8]), 3)
+
+  def test_jaccard(self):
+    """ Tests the jaccard function and its integer kernels. """
+    self.assertAlmostEquals(mod.jaccard('improv spatial intersect join',
+        'spatial join symbol'), 0.4)
+    self.assertAlmostEquals(mod.jaccard_ids([1, 2, 5], [2, 5, 6, 9]), 0.4)
+    self.assertRaises(ZeroDivisionError, mod.jaccard, '', 'a')
+    references = pre.read_data(self.testfilename)
+    block = references[0]
+    _, _, _, _, title_matrix, _ = mod.encode_block(block)
+    rows, cols = mod.get_pairs(len(block))
+    self.assertEquals(mod.get_pair_jaccard(title_matrix, rows, cols).tolist(),
+        [mod.jaccard(block[i].title, block[j].title) for i, j in zip(rows,
+        cols)])
+
+  def test_get_idf_from_blocks(self):
+    """ Tests that the streaming idf equals the one from the corpus. """
+    references, corpus = pre.get_input(self.testfilename)
+    self.assertEquals(mod.get_idf_from_blocks(pre.iter_blocks(
+        self.testfilename)), mod.get_idf(corpus))
+
   def test_tfidf(self):
     """ Tests the tfidf function. """
     references = pre.read_data(self.testfilename)
@@ -350,5 +448,35 @@ class SampleTestCase(unittest.TestCase):
     self.assertEquals(s_tfidf, truth)
 
 
+  def test_soft_tfidf_scorer(self):
+    """ Tests that the cached soft tfidf scorer equals the soft tfidf. """
+    references = pre.read_data(self.testfilename)
+    corpus = pre.get_corpus(references) + ['matt', 'brow']
+    idf = mod.get_idf(corpus)
+    names = ['matt huang kuno jones brow', 'matthew jones c marron brown',
+        'm jones', 'matthew c jones', 'mike w miller']
+    for cache_size in [1, 100]:
+      scorer = mod.SoftTfidf(idf, cache_size=cache_size)
+      for name_a in names:
+        for name_b in names:
+          self.assertEquals(scorer.score(name_a, name_b),
+              mod.soft_tfidf(name_a, name_b, idf))
+      self.assertTrue(len(scorer.matches) <= cache_size)
+
+  def test_soft_tfidf_scorer_fallback(self):
+    """ Tests that the scorer gives the maximum idf to unknown words, without
+        changing the idf, and scores 0 for empty names. """
+    references = pre.read_data(self.testfilename)
+    idf = mod.get_idf(pre.get_corpus(references))
+    known_idf = dict(idf)
+    extended_idf = dict(idf, zzyzx=idf['@max_idf'])
+    scorer = mod.SoftTfidf(idf)
+    self.assertEquals(scorer.score('zzyzx jones', 'zzyzx c jones'),
+        mod.soft_tfidf('zzyzx jones', 'zzyzx c jones', extended_idf))
+    self.assertEquals(idf, known_idf)
+    self.assertEquals(scorer.score('', 'jones'), 0.0)
+    self.assertEquals(scorer.score('', ''), 0.0)
+
+
 if __name__ == '__main__':
   unittest.main()
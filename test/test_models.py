@@ -0,0 +1,64 @@
+""" Unit testing for the models module.
+
+    Run in the project folder as follows:
+    python -m test.test_models
+"""
+
+import unittest
+import pickle
+
+from src import modeling as mod
+from src import models
+from src import preprocessing as pre
+from test.test_cases import SampleTestCase
+
+
+class SampleTestCaseModels(SampleTestCase):
+  """ Using the sample test case for testing the models module. """
+
+  def test_reference_interning(self):
+    """ Tests that repeated strings of references share a single object. """
+    references = pre.read_data(self.testfilename)
+    self.assertIs(references[0][1].name, references[0][2].name)
+    self.assertIs(references[0][0].coauthors[0], references[0][2].coauthors[0])
+    self.assertRaises(AttributeError, setattr, references[0][0], 'other', 1)
+
+  def test_reference_pickling(self):
+    """ Tests that references are pickled with every protocol. """
+    reference = pre.read_data(self.testfilename)[0][0]
+    for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+      result = pickle.loads(pickle.dumps(reference, protocol))
+      self.assertEqual(result, reference)
+      self.assertEqual(result.title, reference.title)
+
+  def test_vocabulary(self):
+    """ Tests the ids of a vocabulary. """
+    vocabulary = models.Vocabulary(['b', 'a'])
+    self.assertEqual(vocabulary.get_ids(['a', 'c', 'b', 'c']), [1, 2, 0, 2])
+    self.assertEqual(vocabulary.values, ['b', 'a', 'c'])
+    self.assertEqual(len(vocabulary), 3)
+
+  def test_block(self):
+    """ Tests the columnar encoding of a block. """
+    references = pre.read_data(self.testfilename)
+    block = models.Block(references[0], mod.get_words)
+    self.assertEqual(block.refids.tolist(), [0, 1, 2])
+    self.assertEqual(block.name_ids.tolist(), [0, 1, 1])
+    self.assertEqual(block.names.values, ['m jones', 'matthew c jones'])
+    self.assertEqual(block.venue_ids.tolist(), [0, 1, 2])
+    self.assertEqual(block.coauthor_offsets.tolist(), [0, 2, 7, 9])
+    self.assertEqual(block.coauthor_ids.tolist(), [0, 1, 0, 2, 3, 4, 5, 0, 1])
+    self.assertEqual(block.get_title_matrix().sum(axis=1).ravel().tolist(),
+        [[7, 6, 6]])
+    shared = models.Block(references[1], mod.get_words, {'name':
+        block.names})
+    self.assertEqual(shared.name_ids.tolist(), [2, 2])
+    reference = references[0][0]
+    unicode_block = models.Block([models.Reference(reference.refid,
+        reference.name, unicode(reference.title), reference.coauthors,
+        reference.venue, None)], mod.get_words)
+    self.assertEqual(unicode_block.get_title_matrix().sum(), 7)
+
+
+if __name__ == '__main__':
+  unittest.main()
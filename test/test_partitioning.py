@@ -6,6 +6,9 @@
 
 import unittest
 
+import numpy as np
+from scipy import sparse
+
 from src import learning as lear
 from src import modeling as mod
 from src import partitioning as part
@@ -22,7 +25,8 @@ class SampleTestCasePartitioning(SampleTestCase):
         [references[2] + references[4] + references[5]]
     pred = lear.train(references, corpus)
     probs = lear.test(references, corpus, pred)
-    self.assertEqual(part.get_probability_matrices(references, probs),[
+    self.assertEqual([matrix.tolist() for matrix in
+        part.get_probability_matrices(references, probs)], [
         [[1.0, 0.89441830645266462, 0.95097107828998639],
          [0.89441830645266462, 1.0, 0.97565300931621723],
          [0.95097107828998639, 0.97565300931621723, 1.0]],
@@ -34,6 +38,119 @@ class SampleTestCasePartitioning(SampleTestCase):
          [0.4067916074419064, 1.0, 0.4067916074419064],
          [0.4067916074419064, 0.4067916074419064, 1.0]]])
 
+  def test_get_probability_matrices_condensed(self):
+    """ Tests that the condensed probabilities expand to the matrices and give
+        the same worlds. """
+    references, corpus = pre.get_input(self.testfilename, labeled=True)
+    references = [references[0], references[1], references[3]] + \
+        [references[2] + references[4] + references[5]]
+    pred = lear.train(references, corpus)
+    probs = lear.test(references, corpus, pred)
+    matrices = part.get_probability_matrices(references, probs)
+    vectors = part.get_probability_matrices(references, probs, condensed=True)
+    for matrix, vector in zip(matrices, vectors):
+      distance = part.transform_distance_matrix(vector)
+      self.assertEqual(part.get_size(vector), len(matrix))
+      self.assertEqual(part.get_square_matrix(distance).tolist(),
+          part.transform_distance_matrix(matrix).tolist())
+    self.assertEqual(part.get_possible_worlds(references, probs, 3, seed=1,
+        condensed=True), part.get_possible_worlds(references, probs, 3,
+        seed=1))
+
+  def test_get_possible_worlds_parallel(self):
+    """ Tests that the parallel sampling of worlds equals the serial one under
+        a fixed seed. """
+    references, corpus = pre.get_input(self.testfilename, labeled=True)
+    references = [references[0], references[1], references[3]] + \
+        [references[2] + references[4] + references[5]]
+    pred = lear.train(references, corpus)
+    probs = lear.test(references, corpus, pred)
+    serial = part.get_possible_worlds(references, probs, 3, seed=1)
+    parallel = part.get_possible_worlds(references, probs, 3, workers=2,
+        seed=1)
+    self.assertEqual(parallel, serial)
+    self.assertEqual(len(serial[1]), 3)
+
+  def test_iter_alternative_worlds_unseeded(self):
+    """ Tests that, without seed, the batches and the blocks sampled by
+        parallel workers differ. """
+    distance_matrices = [np.full((8, 8), 0.9), np.full((8, 8), 0.9)]
+    for dm in distance_matrices:
+      np.fill_diagonal(dm, 0.)
+    alt_worlds = list(part.iter_alternative_worlds(distance_matrices, [2, 2],
+        20, workers=2, batch_size=10, method='union-find'))
+    self.assertEqual(len(alt_worlds), 20)
+    self.assertNotEqual(alt_worlds[:10], alt_worlds[10:])
+    self.assertNotEqual([world[0] for world in alt_worlds], [world[1] for
+        world in alt_worlds])
+
+  def test_iter_possible_worlds(self):
+    """ Tests that the streamed worlds equal the materialized ones. """
+    references, corpus = pre.get_input(self.testfilename, labeled=True)
+    references = [references[0], references[1], references[3]] + \
+        [references[2] + references[4] + references[5]]
+    pred = lear.train(references, corpus)
+    probs = lear.test(references, corpus, pred)
+    base_world, alt_worlds = part.iter_possible_worlds(references, probs, 5,
+        seed=1, batch_size=2)
+    alt_worlds = list(alt_worlds)
+    self.assertEqual(base_world, part.get_possible_worlds(references, probs,
+        0)[0])
+    self.assertEqual(len(alt_worlds), 5)
+    self.assertEqual(alt_worlds, list(part.iter_possible_worlds(references,
+        probs, 5, seed=1, batch_size=2)[1]))
+    for world in alt_worlds:
+      self.assertEqual([len(block) for block in world], [len(block) for block
+          in references])
+
+  def test_get_block_worlds(self):
+    """ Tests that the worlds of each block equal the ones sampled for all
+        blocks. """
+    references, corpus = pre.get_input(self.testfilename, labeled=True)
+    references = [references[0], references[1], references[3]] + \
+        [references[2] + references[4] + references[5]]
+    pred = lear.train(references, corpus)
+    probs = lear.test(references, corpus, pred)
+    base_world, alt_worlds = part.get_possible_worlds(references, probs, 5,
+        seed=1)
+    for i, block in enumerate(references):
+      self.assertEqual(part.get_block_worlds(block, probs[i], 5, seed=1,
+          index=i), (base_world[i], [world[i] for world in
+          alt_worlds]))
+
+  def test_get_block_budgets(self):
+    """ Tests the get_entropy and get_block_budgets functions. """
+    self.assertAlmostEqual(part.get_entropy(np.array([0.5, 0.5])), 2.)
+    self.assertAlmostEqual(part.get_entropy(np.array([[1., 0.], [0., 1.]])),
+        0.)
+    self.assertEqual(part.get_entropy(np.ones((1, 1))), 0.)
+    self.assertEqual(part.get_block_budgets([2., 0., 1., 0.01], 10), [10, 0, 5,
+        1])
+
+  def test_get_possible_worlds_block_budget(self):
+    """ Tests that the blocks are sampled according to their budgets. """
+    references, corpus = pre.get_input(self.testfilename, labeled=True)
+    references = [references[0], references[1], references[3]] + \
+        [references[2] + references[4] + references[5]]
+    pred = lear.train(references, corpus)
+    probs = lear.test(references, corpus, pred)
+    budgets = part.get_block_budgets([part.get_entropy(pm) for pm in
+        part.get_probability_matrices(references, probs)], 5)
+    base_world, alt_worlds = part.get_possible_worlds(references, probs, 5,
+        seed=1, block_budget=True)
+    uniform = part.get_possible_worlds(references, probs, 5, seed=1)
+    self.assertEqual(base_world, uniform[0])
+    self.assertEqual(len(alt_worlds), 5)
+    for i, budget in enumerate(budgets):
+      blocks = [world[i] for world in alt_worlds]
+      if budget == 5:
+        self.assertEqual(blocks, [world[i] for world in uniform[1]])
+      elif budget:
+        self.assertEqual(blocks, (blocks[:budget] * 5)[:5])
+      else:
+        for block in blocks:
+          self.assertIs(block, base_world[i])
+
   def test_transform_distance_matrix(self):
     """ Tests the transform_distance_matrix function. """
     self.assertEqual([[round(el, 1) for el in row] for row in 
@@ -52,6 +169,40 @@ class SampleTestCasePartitioning(SampleTestCase):
     distances = [part.transform_distance_matrix(matrix) for matrix in matrices]
     self.assertEqual(part.get_base_partitioning(distances[0]), ([0, 0, 0], 1))
 
+  def test_get_base_partitioning_pruned(self):
+    """ Tests that the base partitioning from sparse probabilities, obtained
+        with pruning, equals the dense one. """
+    references, corpus = pre.get_input(self.testfilename, labeled=True)
+    references = [references[0], references[1], references[3]] + \
+        [references[2] + references[4] + references[5]]
+    pred = lear.train(references, corpus)
+    probs = lear.test(references, corpus, pred)
+    pruned_probs = lear.test(references, corpus, pred, prune=True)
+    matrices = part.get_probability_matrices(references, pruned_probs)
+    self.assertEqual([matrix.toarray().tolist() for matrix in matrices],
+        [matrix.tolist() for matrix in part.get_probability_matrices(
+        references, probs)])
+    self.assertEqual(part.get_possible_worlds(references, pruned_probs, 2,
+        seed=1), part.get_possible_worlds(references, probs, 2, seed=1))
+    self.assertEqual(part.get_possible_worlds(references, pruned_probs, 2,
+        seed=1, method='union-find'), part.get_possible_worlds(references,
+        probs, 2, seed=1, method='union-find'))
+
+  def test_get_base_partitioning_pruned_large_block(self):
+    """ Tests that pruning a block of data with more than 100 references, which
+        is actually pruned, keeps its base partitioning. """
+    references, corpus = pre.get_input('data/training.dat', labeled=True)
+    pred = lear.train(references, corpus)
+    references, corpus = pre.get_input('data/data.dat')
+    block = min([block for block in references if len(block) >= 100], key=len)
+    probs = lear.test([block], corpus, pred)[0]
+    pruned_probs = lear.test([block], corpus, pred, prune=True)[0]
+    self.assertLess(pruned_probs.nnz, len(probs))
+    self.assertEqual(part.get_base_partitioning(part.transform_distance_matrix(
+        part.get_probability_matrices([block], [pruned_probs])[0])),
+        part.get_base_partitioning(part.transform_distance_matrix(
+        part.get_probability_matrices([block], [probs])[0])))
+
   def test_number_of_clusters(self):
     """ Tests the number_of_clusters function. 
     
@@ -72,6 +223,86 @@ class SampleTestCasePartitioning(SampleTestCase):
       for element in row:
         self.assertTrue(element == 0 or element == 1)
 
+  def test_get_random_matrices(self):
+    """ Tests that the random matrices are symmetric and binary, following the
+        certain probabilities. """
+    probability_matrix = \
+       [[1.0, 0.0, 0.5],
+        [0.0, 1.0, 1.0],
+        [0.5, 1.0, 1.0]]
+    random_matrices = part.get_random_matrices(probability_matrix, 4)
+    self.assertEqual(random_matrices.shape, (4, 3, 3))
+    for random_matrix in random_matrices:
+      self.assertEqual(random_matrix.tolist(), random_matrix.T.tolist())
+      self.assertEqual([random_matrix[0][0], random_matrix[0][1],
+          random_matrix[1][2]], [1, 0, 1])
+      self.assertIn(random_matrix[0][2], [0, 1])
+
+  def test_get_possible_worlds_methods(self):
+    """ Tests the alternative worlds sampled from random matrices. """
+    references, corpus = pre.get_input(self.testfilename, labeled=True)
+    references = [references[0], references[1], references[3]] + \
+        [references[2] + references[4] + references[5]]
+    pred = lear.train(references, corpus)
+    probs = lear.test(references, corpus, pred)
+    for method in ['kmedoids', 'components', 'union-find']:
+      base_world, alt_worlds = part.get_possible_worlds(references, probs, 3,
+          seed=1, method=method)
+      self.assertEqual(part.get_possible_worlds(references, probs, 3, workers=2,
+          seed=1, method=method), (base_world, alt_worlds))
+      for world in alt_worlds:
+        if method == 'kmedoids':
+          self.assertEqual([part.number_of_clusters(block) for block in world],
+              [part.number_of_clusters(block) for block in base_world])
+        self.assertEqual([len(block) for block in world], [len(block) for block
+            in references])
+    self.assertEqual(part.get_possible_worlds(references, probs, 3, seed=1,
+        method='components'), part.get_possible_worlds(references, probs, 3,
+        seed=1, method='union-find'))
+    self.assertRaises(ValueError, part.get_possible_worlds, references, probs,
+        1, method='other')
+
+  def test_get_edge_samples_sparse(self):
+    """ Tests that the edges sampled from a sparse matrix, without the pruned
+        pairs, equal the ones of its dense counterpart. """
+    probability_matrix = \
+       [[1.0, 0.0, 0.5, 0.2],
+        [0.0, 1.0, 0.9, 0.0],
+        [0.5, 0.9, 1.0, 0.4],
+        [0.2, 0.0, 0.4, 1.0]]
+    dense_samples = part.get_edge_samples(probability_matrix, 5,
+        np.random.RandomState(1))
+    sparse_samples = part.get_edge_samples(sparse.csr_matrix(
+        probability_matrix), 5, np.random.RandomState(1))
+    for dense_array, sparse_array in zip(dense_samples, sparse_samples):
+      self.assertEqual(dense_array.tolist(), sparse_array.tolist())
+    distance_matrix = part.transform_distance_matrix(sparse.csr_matrix(
+        probability_matrix))
+    self.assertTrue(sparse.issparse(part.get_sampled_matrix(distance_matrix,
+        'union-find')))
+    self.assertEqual(part.get_sampled_matrix(distance_matrix,
+        'distance').tolist(), (1 - np.array(probability_matrix)).tolist())
+    self.assertEqual(part.get_alternative_partitionings(distance_matrix, 2, 5,
+        [1], 'union-find'), part.get_alternative_partitionings(1 -
+        np.array(probability_matrix), 2, 5, [1], 'union-find'))
+
+  def test_get_components_partitioning(self):
+    """ Tests the get_components_partitioning function. """
+    adjacency = \
+        [[1, 0, 1],
+         [0, 1, 0],
+         [1, 0, 1]]
+    self.assertEqual(part.get_components_partitioning(adjacency), [0, 1, 0])
+
+  def test_get_union_find_labels(self):
+    """ Tests that union-find labels equal the sparse traversal ones. """
+    rows = np.array([4, 1, 5, 3])
+    cols = np.array([5, 3, 2, 6])
+    self.assertEqual(part.get_union_find_labels(7, rows, cols), [0, 1, 2, 1, 2,
+        2, 1])
+    self.assertEqual(part.get_components_labels(7, rows, cols), [0, 1, 2, 1, 2,
+        2, 1])
+
   def test_get_alternative_partitioning(self):
     """ Tests the get_alternative_partitioning function. """
     distance = \
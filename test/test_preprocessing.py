@@ -128,6 +128,14 @@ class SampleTestCase(unittest.TestCase):
           'comput architectur talk slide', None)]]
     self.assertEquals(references, truth)
 
+  def test_iter_blocks(self):
+    """ Tests that the lazy reader yields the blocks of read_data. """
+    blocks = pre.iter_blocks(self.testfilename, labeled=True)
+    self.assertEquals(blocks.next(), pre.read_data(self.testfilename,
+        labeled=True)[0])
+    self.assertEquals(list(pre.iter_blocks(self.testfilename, limit=4)),
+        pre.read_data(self.testfilename, limit=4))
+
   def test_get_corpus(self):
     """ Tests the function get_corpus. """
     references = pre.read_data(self.testfilename)
@@ -1,5 +1,7 @@
 import unittest
 
+import numpy as np
+
 import test_cases
 
 import src.preprocessing as pre
@@ -128,25 +130,85 @@ class RankingSampleTestCase(test_cases.SampleTestCase):
     self.assertEqual(result, truth)
 
  
-  def test_match_rankings(self):
+  def test_match_partitionings(self):
     truth = [[2, 2], [1, 1], [0, 0], [4, 3], [3, 4], [5, 5], [6, 6], [7, 7]]
+    result = rank.match_partitionings(self.base_partitioning,
+        self.alt_partitionings)
+    self.assertEqual(result, truth)
+
+
+  def test_match_partitionings_parallel(self):
+    result = rank.match_partitionings(self.base_partitioning,
+        self.alt_partitionings, workers=2)
+    self.assertEqual(result, rank.match_partitionings(self.base_partitioning,
+        self.alt_partitionings))
+
+  def test_match_labels(self):
+    labels_a = np.array(self.base_partitioning[0])
+    result = rank.match_labels(labels_a, [np.array([0, 1, 1]), np.array([0, 0,
+        0]), np.array([0, 1, 2])])
+    self.assertEqual([zip(*pairs) for pairs in result], [[(0, 0), (1, 1)],
+        [(0, 0), (1, 0)], [(0, 0), (1, 2)]])
+
+  def test_get_partitioning_positions(self):
     ranking_a = rank.get_ranking(self.references, self.base_partitioning, len)
-    rankings_b = []
+    positions, _ = rank.get_partitioning_positions(self.base_partitioning)
+    self.assertEqual(np.argsort(positions).tolist(), ranking_a.ordering)
+
+  def test_uncertainty_accumulator(self):
+    truth = rank.calculate_uncertainties(rank.match_partitionings(
+        self.base_partitioning, self.alt_partitionings))
+    accumulator = rank.UncertaintyAccumulator(self.base_partitioning)
     for alt_partitioning in self.alt_partitionings:
-      ranking_b = rank.get_ranking(self.references, alt_partitioning, len)
-      rankings_b.append(ranking_b)
-    result = rank.match_rankings(ranking_a, rankings_b)
-    self.assertEqual(result, truth)
+      accumulator.add([alt_partitioning])
+    self.assertEqual(accumulator.n_worlds, 2)
+    self.assertEqual(accumulator.get_uncertainties(), truth)
+    result = rank.rank(self.references, self.base_partitioning,
+        iter(self.alt_partitionings), batch_size=1)
+    self.assertEqual(result.uncertainty, rank.normalize_uncertainties(truth))
+
+  def test_rank_adaptive(self):
+    alt_partitionings = self.alt_partitionings * 3
+    truth = rank.rank(self.references, self.base_partitioning,
+        alt_partitionings)
+    result, n_worlds, reason = rank.rank_adaptive(self.references,
+        self.base_partitioning, iter(alt_partitionings), batch_size=2)
+    self.assertEqual((n_worlds, reason), (6, 'exhausted'))
+    self.assertEqual(result.uncertainty, truth.uncertainty)
+    _, n_worlds, reason = rank.rank_adaptive(self.references,
+        self.base_partitioning, iter(alt_partitionings), tolerance=10,
+        batch_size=2)
+    self.assertEqual((n_worlds, reason), (4, 'converged'))
+    _, n_worlds, reason = rank.rank_adaptive(self.references,
+        self.base_partitioning, iter(alt_partitionings), time_budget=0,
+        batch_size=2)
+    self.assertEqual((n_worlds, reason), (2, 'time'))
+
+  def test_match_partitionings_reused(self):
+    alt_partitionings = [[self.alt_partitionings[0][0]] +
+        self.base_partitioning[1:], self.base_partitioning]
+    copies = [[list(labels) for labels in alt_partitioning] for
+        alt_partitioning in alt_partitionings]
+    self.assertEqual(rank.match_partitionings(self.base_partitioning,
+        alt_partitionings), rank.match_partitionings(self.base_partitioning,
+        copies))
+    labels_b = np.array([0, 1, 1])
+    result = rank.match_labels(np.array([0, 0, 1]), [labels_b, labels_b])
+    self.assertIs(result[0], result[1])
+
+  def test_match_labels_different_sizes(self):
+    labels_a = np.array([0, 0, 1, 2])
+    result = rank.match_labels(labels_a, [np.array([0, 0, 0, 1]), np.array([0,
+        1, 2, 3])])
+    self.assertEqual(sorted(zip(*result[0])), [(0, 0), (1, 0), (2, 1)])
+    self.assertEqual(len(result[1][0]), 3)
+    self.assertEqual(dict(zip(*result[1]))[2], 3)
 
 
   def test_calculate_uncertainties(self):
     truth = [0.94, 0., 0.94, 0.47, 0.47, 0., 0., 0.]
-    ranking_a = rank.get_ranking(self.references, self.base_partitioning, len)
-    rankings_b = []
-    for alt_partitioning in self.alt_partitionings:
-      ranking_b = rank.get_ranking(self.references, alt_partitioning, len)
-      rankings_b.append(ranking_b)
-    matchings = rank.match_rankings(ranking_a, rankings_b)
+    matchings = rank.match_partitionings(self.base_partitioning,
+        self.alt_partitionings)
     result = rank.calculate_uncertainties(matchings)
     for i in range(len(result)):
       self.assertAlmostEqual(result[i], truth[i], 2)
@@ -154,11 +216,8 @@ class RankingSampleTestCase(test_cases.SampleTestCase):
 
   def test_calculate_uncertainties(self):
     ranking_a = rank.get_ranking(self.references, self.base_partitioning, len)
-    rankings_b = []
-    for alt_partitioning in self.alt_partitionings:
-      ranking_b = rank.get_ranking(self.references, alt_partitioning, len)
-      rankings_b.append(ranking_b)
-    matchings = rank.match_rankings(ranking_a, rankings_b)
+    matchings = rank.match_partitionings(self.base_partitioning,
+        self.alt_partitionings)
     uncertainty = rank.calculate_uncertainties(matchings)
     ranking_a.set_uncertainty(uncertainty)
     truth = ranking_a
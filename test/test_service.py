@@ -0,0 +1,101 @@
+""" Unit testing for the service module.
+
+    Run in the project folder as follows:
+    python -m test.test_service
+"""
+
+import json
+import unittest
+from StringIO import StringIO
+
+import numpy as np
+
+from src import learning as lear
+from src import modeling as mod
+from src import preprocessing as pre
+from src import service
+from src.models import Ranking, Reference
+from test.test_cases import SampleTestCase
+
+
+class SampleTestCaseService(SampleTestCase):
+  """ Using the sample test case for testing the service module. """
+
+  def get_scorer(self):
+    """ Trains a predictor in the sample test case and builds a scorer with the
+        idf of the sample. """
+    references, corpus = pre.get_input(self.testfilename, labeled=True)
+    references = [references[0], references[1], references[3]] + \
+        [references[2] + references[4] + references[5]]
+    pred = lear.train(references, corpus)
+    return service.Scorer(pred, mod.get_idf(corpus)), references, corpus
+
+  def test_get_probabilities(self):
+    """ Tests that the probabilities of a block equal the ones of the test
+        phase. """
+    scorer, references, corpus = self.get_scorer()
+    probs = lear.test(references, corpus, scorer.pred)
+    for block, block_probs in zip(references, probs):
+      self.assertTrue(np.allclose(scorer.get_probabilities(block),
+          block_probs))
+
+  def test_serve(self):
+    """ Tests the answers to valid and invalid requests. """
+    scorer, references, _ = self.get_scorer()
+    block = [{'name': ref.name, 'title': ref.title, 'coauthors': ref.coauthors,
+        'venue': ref.venue} for ref in references[0]]
+    block.append({'name': 'unseen name', 'title': 'unseen title'})
+    requests = StringIO('\n'.join([json.dumps({'id': 1, 'references': block,
+        'alternatives': 3, 'seed': 1}), 'invalid', json.dumps({'id': 3,
+        'references': []}), json.dumps({'id': 4, 'references': [{'name':
+        'unseen name'}, {'name': 'unseen name', 'title': 'unseen title'}]})])
+        + '\n')
+    responses = StringIO()
+    service.serve(scorer, requests, responses)
+    responses = [json.loads(line) for line in
+        responses.getvalue().splitlines()]
+    self.assertEqual(len(responses), 4)
+    self.assertEqual(responses[0]['id'], 1)
+    self.assertEqual(len(responses[0]['probabilities']), 6)
+    self.assertEqual(sorted(sum([author['references'] for author in
+        responses[0]['ranking']], [])), range(4))
+    self.assertEqual(responses[1]['id'], None)
+    self.assertIn('error', responses[1])
+    self.assertEqual(responses[2], {'id': 3, 'error':
+        'Request without references'})
+    self.assertEqual(responses[3], {'id': 4, 'error':
+        'Reference 0 without title words'})
+
+  def test_handle_uncertainty_positions(self):
+    """ Tests that each author of the response gets the uncertainty of its
+        position, for a ranking whose ordering is not the identity. """
+    scorer, references, _ = self.get_scorer()
+    block = references[0][:3]
+    ranking = Ranking(authors={0: [block[0]], 1: [block[1], block[2]]},
+        blocks=[0, float('inf')], rank_function=len)
+    ranking.set_uncertainty([2, 7])
+    self.assertEqual(ranking.ordering, [1, 0])
+    scorer.rank = lambda *args: (np.zeros(3), ranking)
+    response = scorer.handle({'id': 1, 'references': [{'name': ref.name,
+        'title': ref.title} for ref in block]})
+    self.assertEqual([(author['references'], author['uncertainty']) for author
+        in response['ranking']], [([block[1].refid, block[2].refid], 2),
+        ([block[0].refid], 7)])
+
+  def test_get_probabilities_unseen_words(self):
+    """ Tests that unseen name words do not change the idf of the scorer nor
+        the probabilities of the following requests. """
+    scorer, references, _ = self.get_scorer()
+    idf = dict(scorer.idf)
+    probs = scorer.get_probabilities(references[0])
+    block = [Reference(refid=i, name='zzyzx ' + ref.name, title=ref.title,
+        coauthors=ref.coauthors, venue=ref.venue, label=None) for i, ref in
+        enumerate(references[0])]
+    scorer.get_probabilities(block)
+    self.assertEqual(scorer.idf, idf)
+    self.assertEqual(scorer.get_probabilities(references[0]).tolist(),
+        probs.tolist())
+
+
+if __name__ == '__main__':
+  unittest.main()